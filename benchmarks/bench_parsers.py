@@ -0,0 +1,204 @@
+"""GPUParser 解析效能基準測試
+
+以錄製的封存檔（scraper.py --record-path 產生）作為固定語料，
+對每個解析入口與每個解析後端量測 pages/sec、p50/p99 延遲與峰值記憶體，
+結果存為 JSON，並可與基準結果比較以發現解析成本退化。
+安裝 lxml 時列表頁入口不經過 BeautifulSoup，改在 lxml-stream 標籤下只量測一次；
+各後端下另以 extract_product_rows_dom 量測完整 DOM 的列表擷取。
+
+    python benchmarks/bench_parsers.py corpus.jsonl.gz --output bench.json
+    python benchmarks/bench_parsers.py corpus.jsonl.gz --baseline bench.json
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import logging
+import argparse
+import platform
+import tracemalloc
+from urllib.parse import urljoin
+
+# 添加專案根目錄到路徑
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.parsers import GPUParser, PARSER_BACKENDS, HAS_LXML
+from utils.http_cache import ResponseCache
+
+BASE_URL = 'https://www.techpowerup.com'
+
+# 安裝 lxml 時列表頁一律以增量解析擷取，與 GPUParser.backend 無關，只在此標籤下量測一次
+STREAM_LABEL = 'lxml-stream'
+
+
+def load_corpus(path):
+    """載入錄製的頁面，依頁面類型分組"""
+    pages = {'list': [], 'gpu': [], 'board': [], 'review': [], 'other': []}
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                pages[ResponseCache.page_type(record['url'])].append(record)
+    return pages
+
+
+def extract_product_rows_dom(html):
+    """以目前的解析後端建立完整 DOM 擷取產品列表（未安裝 lxml 時列表頁使用的路徑）"""
+    return GPUParser._extract_product_rows_soup(GPUParser.make_soup(html))
+
+
+def build_cases(pages):
+    """將語料轉為 (各後端量測的 {名稱: (解析入口, 參數列表)}, 與後端無關的列表頁增量解析)"""
+    list_args = [(r['body'],) for r in pages['list']]
+    cases = {
+        'extract_product_rows_dom': (extract_product_rows_dom, list_args),
+        'parse_product_page': (GPUParser.parse_product_page, [(r['body'], r['url']) for r in pages['gpu']]),
+        'parse_product_detail': (GPUParser.parse_product_detail, [(r['body'], r['url']) for r in pages['gpu'] + pages['board']]),
+        'parse_boards_section': (GPUParser.parse_boards_section, [(r['body'],) for r in pages['gpu']]),
+        'parse_review_options': (GPUParser.parse_review_options, [(r['body'],) for r in pages['review']]),
+    }
+
+    list_cases = {
+        'parse_product_list': (GPUParser.parse_product_list, list_args),
+        'parse_product_rows': (GPUParser.parse_product_rows, list_args),
+    }
+    stream_cases = {}
+    if HAS_LXML:
+        stream_cases = list_cases
+    else:
+        cases.update(list_cases)
+
+    # 評測子頁面的類型來自評測首頁的選項文字
+    review_by_url = {r['url']: r for r in pages['review']}
+    review_cases = []
+    for record in pages['review']:
+        for option in GPUParser.parse_review_options(record['body']):
+            option_record = review_by_url.get(urljoin(BASE_URL, option['value']))
+            if option_record:
+                review_cases.append((option_record['body'], option['text']))
+    cases['parse_review_content'] = (GPUParser.parse_review_content, review_cases)
+    return cases, stream_cases
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_case(func, args_list, repeat):
+    """量測單一解析入口：延遲與吞吐量（不追蹤記憶體），再另跑一輪量測峰值記憶體"""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for args in args_list:
+            t0 = time.perf_counter()
+            func(*args)
+            latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - started
+
+    peak = 0
+    for args in args_list:
+        tracemalloc.start()
+        func(*args)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        'pages': len(latencies),
+        'pages_per_sec': len(latencies) / total if total else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'peak_memory_kb': peak / 1024,
+    }
+
+
+def run_cases(label, cases, repeat):
+    results = {}
+    for name, (func, args_list) in cases.items():
+        if not args_list:
+            continue
+        results[name] = stats = run_case(func, args_list, repeat)
+        print(f"[{label}] {name:24s} {stats['pages']:5d} 頁  "
+              f"{stats['pages_per_sec']:8.1f} 頁/秒  p50 {stats['p50_ms']:7.2f} ms  "
+              f"p99 {stats['p99_ms']:7.2f} ms  峰值 {stats['peak_memory_kb']:9.0f} KB")
+    return results
+
+
+def run_benchmark(corpus_path, backends, repeat):
+    pages = load_corpus(corpus_path)
+    cases, stream_cases = build_cases(pages)
+    results = {}
+
+    for backend in backends:
+        GPUParser.set_backend(backend)
+        results[backend] = run_cases(backend, cases, repeat)
+    if stream_cases:
+        results[STREAM_LABEL] = run_cases(STREAM_LABEL, stream_cases, repeat)
+
+    return {
+        'corpus': os.path.abspath(corpus_path),
+        'corpus_pages': {kind: len(records) for kind, records in pages.items()},
+        'python': platform.python_version(),
+        'created_at': time.time(),
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """與基準比較，返回退化項目列表"""
+    regressions = []
+    for backend, extractors in current['results'].items():
+        for name, stats in extractors.items():
+            base = baseline.get('results', {}).get(backend, {}).get(name)
+            if not base:
+                continue
+            for metric, higher_is_worse in (('p50_ms', True), ('p99_ms', True), ('peak_memory_kb', True), ('pages_per_sec', False)):
+                old, new = base[metric], stats[metric]
+                if not old:
+                    continue
+                change = (new - old) / old if higher_is_worse else (old - new) / old
+                if change > threshold:
+                    regressions.append(f"[{backend}] {name} {metric}: {old:.2f} -> {new:.2f} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GPUParser 解析效能基準測試')
+    parser.add_argument('corpus', help='錄製的封存檔 (.jsonl.gz)')
+    parser.add_argument('--backends', nargs='+', choices=PARSER_BACKENDS,
+                        default=[b for b in PARSER_BACKENDS if b != 'lxml' or HAS_LXML],
+                        help='要量測的解析後端')
+    parser.add_argument('--repeat', type=int, default=3, help='每個頁面重複解析次數')
+    parser.add_argument('--output', help='將結果存為 JSON')
+    parser.add_argument('--baseline', help='與此 JSON 基準結果比較')
+    parser.add_argument('--threshold', type=float, default=0.10, help='視為退化的變化比例')
+    args = parser.parse_args()
+
+    # 解析器每頁都會輸出 INFO 日誌，基準測試時關閉以免影響量測
+    logging.basicConfig(level=logging.WARNING)
+
+    result = run_benchmark(args.corpus, args.backends, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"結果已存至 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print("發現效能退化:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("與基準相比沒有效能退化")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,8 @@ import aiohttp  # 改用 aiohttp 代替 requests
 import asyncio
 import time
 import random
-from urllib.parse import urljoin
+import itertools
+from urllib.parse import urljoin, urlencode
 from colorama import init, Fore, Style
 from dotenv import load_dotenv
 from datetime import datetime
@@ -19,13 +20,35 @@ load_dotenv()
 # 設定默認的 BASE_URL（如果環境變數未設定）
 DEFAULT_BASE_URL = 'https://www.techpowerup.com'
 
+# 各管線階段預設的工作協程數（parse 預設與解析行程數相同）
+DEFAULT_STAGE_WORKERS = {'fetch': 3, 'persist': 3, 'review': 3}
+
+# 預設的續爬進度紀錄檔
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'checkpoints', 'crawl.sqlite3')
+
+# 預設的 HTTP 回應快取目錄
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'http')
+
+# 預設列表頁有筆數上限，依篩選條件（廠商 × 發表年份）分頁探索完整目錄；
+# 列表頁的篩選表單解析失敗時使用以下預設值
+DEFAULT_LIST_FACETS = {
+    'mfgr': ['3dfx', 'AMD', 'ATI', 'Intel', 'Matrox', 'NVIDIA', 'Sony', 'XGI'],
+    'released': [str(year) for year in range(1986, datetime.now().year + 1)],
+}
+
 # 添加工作目錄到路徑
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # 導入自定義模組
 from utils.anti_crawl import AntiCrawl
-from utils.parsers import GPUParser
-from utils.database import Database
+from utils.parsers import GPUParser, create_parse_executor
+from utils.stream_parser import ReviewStreamParser, STREAM_CHUNK_SIZE, HAS_LXML
+from utils.debug_capture import debug_capture
+from utils.storage_backends import create_storage, CRAWL_META_CATEGORY, SOURCE_URL_SPEC, FINGERPRINT_SPEC
+from utils.http_cache import ResponseCache
+from utils.config import ScraperConfig
+from utils.checkpoint import CheckpointStore
+from utils.replay import ResponseRecorder, ReplayTransport
 from utils.state_manager import ScrapeState, StorageManager  # 新增導入
 
 # 設置詳細日誌
@@ -47,18 +70,80 @@ logger = logging.getLogger(__name__)
 class GPUScraper:
     """GPU 爬蟲主類"""
     
-    def __init__(self):
+    def __init__(self, cache_dir=None, parser_backend=None, parse_workers=None, stage_workers=None, queue_size=50,
+                 rate_limit=None, rate_limit_min=None, db_pool_size=None, checkpoint_path=None,
+                 record_path=None, replay_path=None, replay_latency=0.0, storage=None, storage_path=None,
+                 stream_reviews=False, discovery=None, discovery_workers=3, db=None):
         self.base_url = os.getenv('BASE_URL', DEFAULT_BASE_URL)
-        self.anti_crawl = AntiCrawl()
-        self.db = Database()
+        if parser_backend:
+            GPUParser.set_backend(parser_backend)  # 本次執行使用的解析後端
+        self.anti_crawl = AntiCrawl(rate=rate_limit, min_rate=rate_limit_min)
+        self.cache = ResponseCache(cache_dir or os.getenv('HTTP_CACHE_DIR', DEFAULT_CACHE_DIR))  # 硬碟回應快取
+        self.db = db or create_storage(
+            storage or os.getenv('STORAGE_BACKEND', 'sqlserver'),
+            path=storage_path or os.getenv('STORAGE_PATH'),
+            pool_size=db_pool_size
+        )  # 存儲後端（SQL Server / SQLite / Parquet），可由呼叫端預先建立
         self.state = ScrapeState()  # 添加爬蟲狀態管理
         self.storage_manager = StorageManager(self.db, self.state)  # 添加存儲管理器
         self.processed_urls = set()  # 用於去重
+        self.checkpoint = CheckpointStore(checkpoint_path or os.getenv('CHECKPOINT_PATH', DEFAULT_CHECKPOINT_PATH))  # 續爬進度
         self.session = None  # aiohttp session
+        self.error = None  # 最近一次執行失敗的原因
+        
+        # 錄製／回放：回放模式下所有請求都由封存檔提供，不連線到網站
+        self.recorder = ResponseRecorder(record_path) if record_path else None
+        self.replay = ReplayTransport(replay_path, latency=replay_latency) if replay_path else None
+        
+        # 評測頁面以 lxml 增量解析，邊下載邊擷取，不建立完整 DOM
+        if stream_reviews and not HAS_LXML:
+            logger.warning("未安裝 lxml，停用評測頁面串流解析")
+            stream_reviews = False
+        self.stream_reviews = stream_reviews
+        
+        # 產品探索：default 只抓預設列表，facets 依篩選條件並行抓取所有分頁（廠商 × 年份約 330 頁）
+        self.discovery = discovery or os.getenv('DISCOVERY_MODE', 'facets')
+        self.discovery_workers = discovery_workers
         
-        # 添加任務佇列
-        self.product_queue = asyncio.Queue()  # 產品佇列
-        self.board_queue = asyncio.Queue()    # 主板評測佇列
+        # 解析行程池大小，0 表示在事件迴圈中直接解析
+        if parse_workers is None:
+            parse_workers = int(os.getenv('PARSE_WORKERS', str(min(4, os.cpu_count() or 1))))
+        self.parse_workers = parse_workers
+        self.parse_executor = None
+        
+        # 各階段的工作協程數
+        self.stage_workers = {**DEFAULT_STAGE_WORKERS, 'parse': max(1, self.parse_workers), **(stage_workers or {})}
+        
+        # 管線佇列：抓取 → 解析 → 存儲 → 評測，有上限的佇列提供背壓
+        self.product_queue = asyncio.Queue(maxsize=queue_size)   # GPU 抓取佇列
+        self.board_detail_queue = asyncio.Queue()                # 主板詳情抓取佇列（由存儲階段回填）
+        self.parse_queue = asyncio.Queue(maxsize=queue_size)     # 解析佇列
+        self.persist_queue = asyncio.Queue(maxsize=queue_size)   # 存儲佇列
+        self.board_queue = asyncio.Queue(maxsize=queue_size)     # 主板評測佇列
+    
+    @classmethod
+    def from_config(cls, config, db=None):
+        """依 ScraperConfig 建立爬蟲；db 為預先建立的存儲後端，未指定時依設定建立"""
+        return cls(
+            cache_dir=config.cache_dir,
+            parser_backend=config.parser_backend,
+            parse_workers=config.parse_workers,
+            stage_workers=config.stage_workers,
+            queue_size=config.queue_size,
+            rate_limit=config.rate_limit,
+            rate_limit_min=config.rate_limit_min,
+            db_pool_size=config.db_pool_size,
+            checkpoint_path=config.checkpoint_path,
+            record_path=config.record_path,
+            replay_path=config.replay_path,
+            replay_latency=config.replay_latency,
+            storage=config.storage,
+            storage_path=config.storage_path,
+            stream_reviews=config.stream_reviews,
+            discovery=config.discovery,
+            discovery_workers=config.discovery_workers,
+            db=db,
+        )
     
     async def setup_session(self):
         """設置 aiohttp session"""
@@ -66,8 +151,29 @@ class GPUScraper:
             self.session = aiohttp.ClientSession()
             logger.info("建立 HTTP 會話")
     
-    async def fetch_url(self, url, absolute=True):
-        """非同步獲取頁面內容"""
+    async def run_parser(self, parse_func, *args):
+        """在行程池中執行 CPU 密集的解析，避免阻塞事件迴圈"""
+        if self.parse_workers <= 0:
+            return parse_func(*args)
+        
+        if self.parse_executor is None:
+            self.parse_executor = create_parse_executor(self.parse_workers)
+            logger.info(f"啟動解析行程池 ({self.parse_workers} 個行程)")
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.parse_executor, parse_func, *args)
+    
+    def record_response(self, url, body, status=200, headers=None):
+        """錄製模式下保存回應，供離線回放"""
+        if self.recorder is not None:
+            self.recorder.record(url, body, status=status, headers=headers)
+    
+    async def fetch_url(self, url, absolute=True, stream=None):
+        """非同步獲取頁面內容
+
+        stream 為增量解析器（feed/reset）時，網路回應會邊下載邊送入解析器；
+        回應來自快取或回放時不會送入，由呼叫端自行處理。
+        """
         await self.setup_session()
         
         if not absolute:
@@ -77,55 +183,151 @@ class GPUScraper:
             logger.info(f"跳過已處理的 URL: {url}")
             return None
         
+        # 回放模式：從封存檔取得回應
+        if self.replay is not None:
+            html = await self.replay.fetch(url)
+            if html is not None:
+                self.processed_urls.add(url)
+            return html
+        
+        # 快取仍在有效期內時直接使用，不需請求也不需等待
+        cached = self.cache.get(url)
+        if cached and self.cache.is_fresh(cached):
+            self.cache.hits += 1
+            logger.info(f"使用快取: {url}")
+            self.processed_urls.add(url)
+            # 記錄快取保存的回應驗證標頭，而不是送出請求時用的條件標頭
+            validators = {'ETag': cached.get('etag'), 'Last-Modified': cached.get('last_modified')}
+            self.record_response(
+                url, cached['body'],
+                headers={name: value for name, value in validators.items() if value}
+            )
+            return cached['body']
+        
         for attempt in range(5):  # 嘗試 5 次
+            throttled = False
             try:
                 headers = self.anti_crawl.get_headers()
+                headers.update(self.cache.conditional_headers(cached))
+                
+                # 由共用的主機速率控制器決定何時可以發出請求
+                await self.anti_crawl.acquire(url)
                 logger.info(f"請求 URL: {url}")
                 
                 async with self.session.get(url, headers=headers, timeout=30) as response:
-                    response.raise_for_status()
-                    html = await response.text()
+                    if response.status in (429, 503):
+                        throttled = True
+                        self.anti_crawl.record_throttle(url, response.headers.get('Retry-After'))
+                    
+                    if response.status == 304 and cached:
+                        # 內容未變更，沿用快取
+                        self.cache.touch(cached)
+                        self.cache.revalidated += 1
+                        html = cached['body']
+                        if stream is not None:
+                            stream.reset()  # 捨棄先前失敗嘗試送入的部分內容
+                    else:
+                        response.raise_for_status()
+                        if stream is not None:
+                            # 重試時重新開始解析，完整內容仍保留給快取與錄製
+                            stream.reset(response.charset or 'utf-8')
+                            chunks = []
+                            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                                chunks.append(chunk)
+                                stream.feed(chunk)
+                            html = b''.join(chunks).decode(response.charset or 'utf-8', errors='replace')
+                        else:
+                            html = await response.text()
+                        self.cache.store(
+                            url, html,
+                            etag=response.headers.get('ETag'),
+                            last_modified=response.headers.get('Last-Modified')
+                        )
+                        self.cache.misses += 1
                 
-                # 使用非同步等待延遲
-                await asyncio.sleep(self.anti_crawl.get_random_delay())
+                self.anti_crawl.record_success(url)
                 self.processed_urls.add(url)
+                # 304 重新驗證時記錄實際狀態，內容仍保存快取的版本供回放使用
+                self.record_response(url, html, status=response.status, headers=response.headers)
                 return html
+            except aiohttp.ClientResponseError as e:
+                # 404/410 等用戶端錯誤不代表主機負載，不降速也不重試；429 與 5xx 照常退避
+                if e.status != 429 and e.status < 500:
+                    logger.warning(f"無法獲取 {url}: HTTP {e.status}")
+                    return None
+                if not throttled:
+                    self.anti_crawl.record_error(url)
+                if not await self.anti_crawl.handle_retry_async(attempt):
+                    logger.error(f"無法獲取 {url}: {str(e)}")
+                    return None
             except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if not throttled:
+                    self.anti_crawl.record_error(url)
                 if not await self.anti_crawl.handle_retry_async(attempt):
                     logger.error(f"無法獲取 {url}: {str(e)}")
                     return None
-                await asyncio.sleep(1)  # 額外延遲
         
         return None
     
-    async def scrape_product_list(self):
-        """爬取產品列表"""
-        url = urljoin(self.base_url, '/gpu-specs/')
+    async def parse_list_page(self, html, facet_names=()):
+        """解析產品列表頁，返回 (工作項目列表, {篩選參數: [可選值, ...]})"""
+        # 解析行程只回傳精簡的 (名稱, 連結, 指紋)，在此展開為工作項目
+        rows, facets = await self.run_parser(GPUParser.parse_list_page, html, facet_names)
+        return [{'name': name, 'url': url, 'fingerprint': fingerprint} for name, url, fingerprint in rows], facets
+    
+    async def scrape_product_list(self, path='/gpu-specs/'):
+        """爬取產品列表（預設為未篩選的列表頁）"""
+        url = urljoin(self.base_url, path)
         html = await self.fetch_url(url)
         
         if not html:
-            logger.error("無法獲取產品列表")
+            logger.error(f"無法獲取產品列表: {url}")
             return []
         
-        return GPUParser.parse_product_list(html)
+        gpu_list, _ = await self.parse_list_page(html)
+        return gpu_list
     
-    async def scrape_product_detail(self, gpu):
-        """爬取產品詳情"""
-        html = await self.fetch_url(gpu['url'], absolute=False)
-        
+    async def discover_products(self, on_batch):
+        """探索產品目錄：先解析預設列表頁，再依篩選條件組合並行抓取各分頁
+
+        每個列表頁解析完成就交給 on_batch 處理；on_batch 返回 False 時不再抓取其餘分頁。
+        """
+        url = urljoin(self.base_url, '/gpu-specs/')
+        html = await self.fetch_url(url)
         if not html:
-            logger.error(f"無法獲取產品詳情: {gpu['name']}")
-            return None, None, None
+            logger.error("無法獲取產品列表")
+            return
         
-        # 解析產品詳情
-        product_data, specs_data = GPUParser.parse_product_detail(html, gpu['url'])
-        # print(f'product_data: {product_data}')
-        # print(f'specs_data: {specs_data}')
-
-        # 解析主板部分
-        board_data = GPUParser.parse_boards_section(html)
+        # 篩選表單的選項與產品列在同一次解析中取得，不另外建立 DOM
+        facet_names = tuple(DEFAULT_LIST_FACETS) if self.discovery == 'facets' else ()
+        gpu_list, facets = await self.parse_list_page(html, facet_names)
+        if not await on_batch(gpu_list) or self.discovery != 'facets':
+            return
         
-        return product_data, specs_data, board_data
+        facets = {name: facets.get(name) or values for name, values in DEFAULT_LIST_FACETS.items()}
+        paths = [
+            f"/gpu-specs/?{urlencode({**dict(zip(facets, combination)), 'sort': 'name'})}"
+            for combination in itertools.product(*facets.values())
+        ]
+        logger.info(f"依篩選條件探索 {len(paths)} 個列表分頁 ({', '.join(f'{name}: {len(values)}' for name, values in facets.items())})")
+        
+        # 請求速率由共用的主機速率控制器限制，這裡只限制同時進行的分頁數
+        semaphore = asyncio.Semaphore(self.discovery_workers)
+        stopped = False
+        
+        async def discover_facet(path):
+            nonlocal stopped
+            async with semaphore:
+                if stopped:
+                    return
+                gpu_list = await self.scrape_product_list(path)
+                if gpu_list and not await on_batch(gpu_list):
+                    stopped = True
+        
+        results = await asyncio.gather(*(discover_facet(path) for path in paths), return_exceptions=True)
+        for path, result in zip(paths, results):
+            if isinstance(result, Exception):
+                logger.error(f"探索列表分頁 {path} 失敗: {str(result)}")
     
     async def scrape_review(self, review_url):
         """爬取評測內容"""
@@ -136,110 +338,232 @@ class GPUScraper:
             return None
         
         # 解析評測選項
-        options = GPUParser.parse_review_options(html)
-        review_contents = []
+        options = await self.run_parser(GPUParser.parse_review_options, html)
         
-        # 爬取每個選項的內容
-        for option in options:
-            option_url = option['value']
-            option_html = await self.fetch_url(option_url, absolute=False)
-            
-            if option_html:
-                content, review_data = GPUParser.parse_review_content(option_html, option['text'])
-                review_contents.append({
-                    'type': option['text'],
-                    'content': content,
-                    'data': review_data
-                })
+        async def scrape_option(option):
+            """爬取並解析單一評測子頁面"""
+            if self.stream_reviews:
+                content, review_data = await self.scrape_review_streaming(option['value'], option['text'])
+                if content is None:
+                    return None
+            else:
+                option_html = await self.fetch_url(option['value'], absolute=False)
+                if not option_html:
+                    return None
+                
+                content, review_data = await self.run_parser(GPUParser.parse_review_content, option_html, option['text'])
+            return {
+                'type': option['text'],
+                'content': content,
+                'data': review_data
+            }
+        
+        # 同時爬取所有選項（仍受主機速率控制），結果依選項順序組合
+        results = await asyncio.gather(*(scrape_option(option) for option in options), return_exceptions=True)
+        
+        review_contents = []
+        for option, result in zip(options, results):
+            if isinstance(result, Exception):
+                logger.error(f"爬取評測子頁面 {option['text']} 失敗: {str(result)}")
+            elif result:
+                review_contents.append(result)
         
         return review_contents
     
-    async def product_worker(self):
-        """處理產品佇列的工作協程"""
+    async def scrape_review_streaming(self, url, review_type):
+        """邊下載邊解析評測子頁面，只擷取章節、圖片與表格列"""
+        stream = ReviewStreamParser(with_tables=GPUParser.review_needs_tables(review_type))
+        html = await self.fetch_url(url, absolute=False, stream=stream)
+        if not html:
+            return None, None
+        
+        try:
+            if not stream.fed:
+                # 快取或回放的內容一次送入
+                stream.feed(html)
+            parts = stream.close()
+        except Exception as e:
+            logger.error(f"串流解析評測頁面失敗 {url}: {str(e)}")
+            return None, None
+        
+        return await self.run_parser(GPUParser.build_review_content, parts, review_type)
+    
+    async def load_incremental_index(self):
+        """讀取已存儲產品的來源網址與指紋，供增量模式比對"""
+        stored = await self.db.get_crawled_products()
+        stored_by_url = {row['url']: row for row in stored if row['url']}
+        # 舊資料沒有記錄來源網址，只能以名稱判斷
+        legacy_names = {row['name'] for row in stored if not row['url'] and row['name']}
+        return stored_by_url, legacy_names
+    
+    @staticmethod
+    def filter_incremental(gpu_list, index):
+        """增量模式：只保留尚未存儲或內容指紋已變更的 GPU（已變更的帶有 product_id）"""
+        stored_by_url, legacy_names = index
+        
+        pending = []
+        for gpu in gpu_list:
+            row = stored_by_url.get(gpu['url'])
+            if row is None:
+                if gpu['name'] not in legacy_names:
+                    pending.append(gpu)
+            elif row['fingerprint'] != gpu.get('fingerprint'):
+                gpu['product_id'] = row['id']
+                pending.append(gpu)
+        return pending
+    
+    @staticmethod
+    def item_key(item):
+        """工作項目在進度紀錄中的鍵值"""
+        if item['kind'] == 'gpu':
+            return item['gpu']['url']
+        return item['board'].get('url') or f"{item['product_id']}:{item['board'].get('name', '')}"
+    
+    async def fetch_worker(self, queue):
+        """抓取階段：下載 GPU 或主板詳情頁，交給解析階段"""
         while True:
+            item = await queue.get()
             try:
-                gpu = await self.product_queue.get()
-                
-                logger.info(f"開始處理產品: {gpu['name']}")
-                print(f"{Fore.CYAN}正在處理 GPU: {gpu['name']}{Style.RESET_ALL}")
-                
-                # 爬取產品詳情
-                product_data, specs_data, board_data = await self.scrape_product_detail(gpu)
-                
-                if not product_data:
-                    logger.warning(f"無法獲取產品 {gpu['name']} 的詳情")
-                    self.product_queue.task_done()
-                    continue
-                
-                # 存儲產品和規格
-                try:
-                    product_id = await self.storage_manager.store_product_complete(product_data, specs_data)
-                    logger.info(f"成功存儲產品 {gpu['name']} (ID: {product_id}) 和規格")
+                if item['kind'] == 'gpu':
+                    gpu = item['gpu']
+                    logger.info(f"開始處理產品: {gpu['name']}")
+                    print(f"{Fore.CYAN}正在處理 GPU: {gpu['name']}{Style.RESET_ALL}")
                     
-                    # 處理所有主板
-                    if board_data:
-                        for board in board_data:
-
-                            try:
-                                # 如果主板有自己的URL，爬取詳細規格
-                                board_specs = {}
-                                if 'url' in board and board['url']:
-                                    board_url = board['url']
-                                    board_html = await self.fetch_url(board_url, absolute=False)
-                                    if board_html:
-                                        board_specs = GPUParser.parse_product_detail(board_html, board_url)
-                                        logger.info(f"成功爬取主板 {board.get('name', '未知主板')} 的詳細規格")
-                                
-                                # 添加規格到主板數據
-                                if board_specs:
-                                    board['specs'] = board_specs
-
-                                # print(f'board: {board}')
-
-                                # 確保有廠商資訊
-                                if 'vendor' not in board and 'name' in board:
-                                    # 嘗試從名稱中提取廠商
-                                    board_name = board['name']
-                                    if ' ' in board_name:
-                                        board['vendor'] = board_name.split(' ')[0]
-                                    else:
-                                        board['vendor'] = "Unknown"
-                                
-                               
-
-                                product_data = convert_to_product_data(board)
-                                specs_data = convert_to_specs_data(board)
-                                # 存儲主板基本資料
-                                board_id = await self.storage_manager.store_product_complete(product_data,specs_data)
-                                
-                                # 如果有評測連結，加入評測佇列
-                                if board_id and 'review_url' in board and board['review_url']:
-                                    await self.board_queue.put({
-                                        'product_id': product_id, 
-                                        'board_id': board_id,
-                                        'board_name': board.get('name', '未知主板'),
-                                        'review_url': board['review_url']
-                                    })
-                                    logger.info(f"將主板 {board.get('name', '未知主板')} 的評測加入佇列")
-                            except Exception as e:
-                                logger.error(f"處理主板 {board.get('name', '未知主板')} 時發生錯誤: {str(e)}")
-                                import traceback
-                                logger.error(traceback.format_exc())
-                                continue
-                except Exception as e:
-                    logger.error(f"處理產品 {gpu['name']} 時發生錯誤: {str(e)}")
-                    import traceback
-                    logger.error(traceback.format_exc())
+                    item['html'] = await self.fetch_url(gpu['url'], absolute=False)
+                    if not item['html']:
+                        logger.warning(f"無法獲取產品 {gpu['name']} 的詳情")
+                        continue
+                    self.checkpoint.mark('gpu', self.item_key(item), 'fetched')
+                else:
+                    board = item['board']
+                    # 沒有自己 URL 的主板無法取得規格，直接略過；標記為完成，續爬時才不會一再重新排入
+                    if not board.get('url'):
+                        logger.warning(f"主板 {board.get('name', '未知主板')} 沒有詳情連結，略過")
+                        self.checkpoint.mark('board', self.item_key(item), 'stored')
+                        continue
+                    
+                    item['html'] = await self.fetch_url(board['url'], absolute=False)
+                    if not item['html']:
+                        logger.warning(f"無法獲取主板 {board.get('name', '未知主板')} 的詳情")
+                        continue
+                    self.checkpoint.mark('board', self.item_key(item), 'fetched')
                 
-                # 標記任務完成
-                self.product_queue.task_done()
-                logger.info(f"完成處理產品: {gpu['name']}")
+                await self.parse_queue.put(item)
+            except Exception as e:
+                logger.error(f"抓取工作協程發生錯誤: {str(e)}")
+                import traceback
+                logger.error(traceback.format_exc())
+            finally:
+                queue.task_done()
+    
+    async def parse_worker(self):
+        """解析階段：在行程池中解析頁面，交給存儲階段"""
+        while True:
+            item = await self.parse_queue.get()
+            try:
+                html = item.pop('html')
+                if item['kind'] == 'gpu':
+                    gpu = item['gpu']
+                    # 只建立一次 DOM，同時解析產品詳情、規格與主板部分
+                    product_data, specs_data, board_data = await self.run_parser(
+                        GPUParser.parse_product_page, html, gpu['url']
+                    )
+                    if not product_data:
+                        logger.warning(f"無法解析產品 {gpu['name']} 的詳情")
+                        continue
+                    
+                    item.update(product_data=product_data, specs_data=specs_data, board_data=board_data)
+                else:
+                    board = item['board']
+                    board['specs'] = await self.run_parser(GPUParser.parse_product_detail, html, board['url'])
+                    logger.info(f"成功爬取主板 {board.get('name', '未知主板')} 的詳細規格")
                 
+                self.checkpoint.mark(item['kind'], self.item_key(item), 'parsed')
+                await self.persist_queue.put(item)
             except Exception as e:
-                logger.error(f"產品工作協程發生錯誤: {str(e)}")
+                logger.error(f"解析工作協程發生錯誤: {str(e)}")
                 import traceback
                 logger.error(traceback.format_exc())
-                self.product_queue.task_done()
+            finally:
+                self.parse_queue.task_done()
+    
+    async def persist_worker(self):
+        """存儲階段：寫入產品或主板，並把後續工作排入主板詳情或評測佇列"""
+        while True:
+            item = await self.persist_queue.get()
+            try:
+                if item['kind'] == 'gpu':
+                    await self.persist_product(item)
+                else:
+                    await self.persist_board(item)
+            except Exception as e:
+                name = item['gpu']['name'] if item['kind'] == 'gpu' else item['board'].get('name', '未知主板')
+                logger.error(f"處理 {name} 時發生錯誤: {str(e)}")
+                import traceback
+                logger.error(traceback.format_exc())
+            finally:
+                self.persist_queue.task_done()
+    
+    async def persist_product(self, item):
+        """存儲 GPU 產品和規格，並將其主板排入主板詳情佇列"""
+        gpu = item['gpu']
+        
+        # 記錄來源網址與內容指紋，供下次增量爬取比對
+        specs_data = item['specs_data'] + [
+            {'category': CRAWL_META_CATEGORY, 'name': SOURCE_URL_SPEC, 'value': gpu['url']},
+            {'category': CRAWL_META_CATEGORY, 'name': FINGERPRINT_SPEC, 'value': gpu.get('fingerprint', '')},
+        ]
+        product_id = await self.storage_manager.store_product_complete(
+            item['product_data'], specs_data, existing_id=gpu.get('product_id')
+        )
+        logger.info(f"成功存儲產品 {gpu['name']} (ID: {product_id}) 和規格")
+        
+        # 主板佇列不設上限：存儲階段不能被上游的佇列卡住，否則管線會互相等待
+        for board in item['board_data'] or []:
+            board_item = {'kind': 'board', 'board': board, 'product_id': product_id}
+            # 先記錄主板再標記 GPU 完成，續爬時才不會漏掉主板
+            self.checkpoint.mark('board', self.item_key(board_item), 'queued', payload=board_item)
+            self.board_detail_queue.put_nowait(board_item)
+        
+        self.checkpoint.mark('gpu', self.item_key(item), 'stored', payload={'gpu': gpu, 'product_id': product_id})
+        
+        logger.info(f"完成處理產品: {gpu['name']}")
+    
+    async def persist_board(self, item):
+        """存儲主板，有評測連結時加入評測佇列"""
+        board = item['board']
+        
+        # 確保有廠商資訊
+        if 'vendor' not in board and 'name' in board:
+            # 嘗試從名稱中提取廠商
+            board_name = board['name']
+            if ' ' in board_name:
+                board['vendor'] = board_name.split(' ')[0]
+            else:
+                board['vendor'] = "Unknown"
+        
+        product_data = convert_to_product_data(board)
+        # 記錄來源網址，作為主板 upsert 的自然鍵之一
+        specs_data = convert_to_specs_data(board) + [
+            {'category': CRAWL_META_CATEGORY, 'name': SOURCE_URL_SPEC, 'value': board['url']},
+        ]
+        # 存儲主板基本資料
+        board_id = await self.storage_manager.store_product_complete(product_data, specs_data)
+        
+        # 如果有評測連結，加入評測佇列
+        if board_id and 'review_url' in board and board['review_url']:
+            board_task = {
+                'product_id': item['product_id'], 
+                'board_id': board_id,
+                'board_name': board.get('name', '未知主板'),
+                'review_url': board['review_url']
+            }
+            self.checkpoint.mark('review', board['review_url'], 'queued', payload=board_task)
+            await self.board_queue.put(board_task)
+            logger.info(f"將主板 {board.get('name', '未知主板')} 的評測加入佇列")
+        
+        if board_id:
+            self.checkpoint.mark('board', self.item_key(item), 'stored')
     
     async def board_worker(self):
         """處理主板評測佇列的工作協程"""
@@ -254,12 +578,14 @@ class GPUScraper:
                 
                 if review_contents:
                     # 存儲評測資料到主板記錄
-                    await self.storage_manager.store_review(
+                    stored = await self.storage_manager.store_review(
                         board_task['product_id'],  # GPU ID，用於狀態追蹤
                         board_task['board_id'],    # 主板ID，實際關聯評測的對象
                         board_task['board_name'],  # 主板名稱
                         review_contents
                     )
+                    if stored:
+                        self.checkpoint.mark('review', board_task['review_url'], 'stored')
                     logger.info(f"成功存儲主板 {board_task['board_name']} 的評測")
                 else:
                     logger.warning(f"無法獲取主板 {board_task['board_name']} 的評測內容")
@@ -273,68 +599,122 @@ class GPUScraper:
                 logger.error(traceback.format_exc())
                 self.board_queue.task_done()
     
-    async def run(self, limit=None):
-        """執行爬蟲"""
+    async def run(self, limit=None, mode='full', resume=False):
+        """執行爬蟲
+
+        mode='full' 重新爬取全部 GPU；mode='incremental' 只處理新的或已變更的 GPU。
+        resume=True 時依進度紀錄跳過已完成的 GPU、主板與評測，從上次中斷處繼續。
+        成功時返回 True；失敗時返回 False，錯誤訊息記錄在 self.error。
+        """
+        self.error = None
         try:
+            if resume:
+                logger.info(f"續爬模式，上次進度: {self.checkpoint.get_stats()}")
+            else:
+                self.checkpoint.reset()
+            
             print(f"{Fore.GREEN}開始爬取 GPU 資料{Style.RESET_ALL}")
             logger.info("開始執行爬蟲")
             
             # 建立 HTTP 會話
             await self.setup_session()
             
-            # 爬取產品列表
-            gpu_list = await self.scrape_product_list()
-            
-            if not gpu_list:
-                logger.error("未找到 GPU 列表")
-                return
+            # 啟動各階段工作協程，產品探索期間即可開始處理
+            workers = []
+            stage_targets = [
+                ('fetch', lambda: self.fetch_worker(self.product_queue)),
+                ('fetch', lambda: self.fetch_worker(self.board_detail_queue)),
+                ('parse', self.parse_worker),
+                ('persist', self.persist_worker),
+                ('review', self.board_worker),
+            ]
+            for stage, target in stage_targets:
+                for _ in range(self.stage_workers[stage]):
+                    workers.append(asyncio.create_task(target()))
+            logger.info(f"啟動管線工作協程: {self.stage_workers}")
             
-            logger.info(f"獲取到 {len(gpu_list)} 個 GPU")
+            # 續爬：跳過已存儲的 GPU，並重新排入上次未完成的主板與評測
+            completed = set()
+            if resume:
+                completed = self.checkpoint.completed('gpu')
+                
+                for board_item in self.checkpoint.pending('board'):
+                    self.board_detail_queue.put_nowait(board_item)
+                for board_task in self.checkpoint.pending('review'):
+                    await self.board_queue.put(board_task)
+                logger.info(f"續爬: 已完成 {len(completed)} 個 GPU，重新排入 {self.board_detail_queue.qsize()} 個主板")
             
-            # 可能限制處理數量（用於測試）
+            index = await self.load_incremental_index() if mode == 'incremental' else None
             if limit:
-                gpu_list = gpu_list[:limit]
                 logger.info(f"限制處理數量為 {limit} 個 GPU")
             
-            # 將所有產品加入佇列
-            for gpu in gpu_list:
-                await self.product_queue.put(gpu)
+            seen = set()
+            counts = {'found': 0, 'selected': 0, 'changed': 0, 'skipped': 0}
             
-            # 啟動工作協程
-            product_workers = []
-            board_workers = []
+            async def enqueue(gpu_list):
+                """去重並篩選一個列表頁的產品，立即排入抓取佇列；達到數量限制時返回 False"""
+                selected = []
+                for gpu in gpu_list:
+                    if gpu['url'] not in seen:
+                        seen.add(gpu['url'])
+                        selected.append(gpu)
+                counts['found'] += len(selected)
+                
+                if index is not None:
+                    selected = self.filter_incremental(selected, index)
+                # 可能限制處理數量（用於測試）
+                if limit:
+                    selected = selected[:max(0, limit - counts['selected'])]
+                counts['selected'] += len(selected)
+                counts['changed'] += sum(1 for gpu in selected if 'product_id' in gpu)
+                
+                # 佇列已滿時會等待抓取階段消化
+                for gpu in selected:
+                    if gpu['url'] in completed:
+                        counts['skipped'] += 1
+                        continue
+                    item = {'kind': 'gpu', 'gpu': gpu}
+                    self.checkpoint.mark('gpu', self.item_key(item), 'queued', payload=item)
+                    await self.product_queue.put(item)
+                return not limit or counts['selected'] < limit
             
-            # 產品處理工作協程
-            for i in range(3):  # 同時處理 3 個產品
-                worker = asyncio.create_task(self.product_worker())
-                print(f'worker: {worker}')  # 输出: worker: John Doe
-                product_workers.append(worker)
-                logger.info(f"啟動產品工作協程 #{i+1}")
+            await self.discover_products(enqueue)
             
-            # 主板評測處理工作協程
-            for i in range(3):  # 同時處理 3 個評測
-                worker = asyncio.create_task(self.board_worker())
-                board_workers.append(worker)
-                logger.info(f"啟動主板評測工作協程 #{i+1}")
+            if not counts['found']:
+                self.error = "未找到 GPU 列表"
+                logger.error(self.error)
+            logger.info(f"產品探索完成: 獲取到 {counts['found']} 個 GPU，排入 {counts['selected'] - counts['skipped']} 個")
+            if mode == 'incremental':
+                logger.info(f"增量模式: 有 {counts['selected'] - counts['changed']} 個新產品、{counts['changed']} 個已變更")
+            if resume:
+                logger.info(f"續爬: 跳過 {counts['skipped']} 個已完成的 GPU")
             
-            # 等待產品佇列處理完成
-            await self.product_queue.join()
+            # 依管線順序等待各階段完成：GPU → 主板 → 評測
+            for queue in (self.product_queue, self.parse_queue, self.persist_queue):
+                await queue.join()
             logger.info("所有產品處理完成")
             
-            # 等待主板評測佇列處理完成
+            for queue in (self.board_detail_queue, self.parse_queue, self.persist_queue):
+                await queue.join()
+            logger.info("所有主板處理完成")
+            
             await self.board_queue.join()
             logger.info("所有主板評測處理完成")
             
             # 取消工作協程
-            for worker in product_workers + board_workers:
+            for worker in workers:
                 worker.cancel()
             
             # 輸出統計信息
             stats = self.state.get_stats()
             print(f"{Fore.GREEN}爬蟲完成！共處理 {stats['products']} 個 GPU, {stats['specs']} 條規格, {stats['reviews']} 個評測{Style.RESET_ALL}")
             logger.info(f"爬蟲完成。統計: {stats}")
+            logger.info(f"HTTP 快取統計: {self.cache.get_stats()}")
+            if self.replay:
+                logger.info(f"回放統計: {self.replay.get_stats()}")
             
         except Exception as e:
+            self.error = str(e) or type(e).__name__
             logger.error(f"爬蟲過程中發生錯誤: {str(e)}")
             import traceback
             logger.error(traceback.format_exc())
@@ -344,9 +724,27 @@ class GPUScraper:
                 await self.session.close()
                 logger.info("HTTP 會話已關閉")
             
+            # 關閉解析行程池
+            if self.parse_executor:
+                self.parse_executor.shutdown(wait=True)
+                self.parse_executor = None
+                logger.info("解析行程池已關閉")
+            
             # 關閉數據庫連接
             await self.db.disconnect()
             logger.info("資料庫連接已關閉")
+            
+            # 等待除錯快照寫入完成（未啟用時不做任何事）
+            debug_capture.flush()
+            
+            # 關閉進度紀錄
+            self.checkpoint.close()
+            
+            # 完成錄製
+            if self.recorder:
+                self.recorder.close()
+        
+        return self.error is None
 
 def convert_to_product_data(board):
     # 取出基本資訊
@@ -371,15 +769,14 @@ def convert_to_specs_data(board):
 # 入口點
 if __name__ == "__main__":
     try:
-        # 解析命令列參數
-        import argparse
-        parser = argparse.ArgumentParser(description='TechPowerUp GPU 爬蟲')
-        parser.add_argument('--limit', type=int, help='限制爬取的 GPU 數量（用於測試）')
-        args = parser.parse_args()
+        # 解析命令列參數（未指定時讀取環境變數）
+        config = ScraperConfig.from_args()
+        logger.info(f"爬蟲設定: {config.to_dict()}")
         
         # 執行爬蟲
-        scraper = GPUScraper()
-        asyncio.run(scraper.run(1))
+        scraper = GPUScraper.from_config(config)
+        if not asyncio.run(scraper.run(config.limit, mode=config.mode, resume=config.resume)):
+            sys.exit(1)
     except KeyboardInterrupt:
         print(f"{Fore.YELLOW}使用者中斷爬蟲程序{Style.RESET_ALL}")
         logger.info("使用者中斷爬蟲程序")
@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from aiohttp import web
+
+# 匯入爬蟲（同時完成日誌設定）
+from scraper import GPUScraper
+from utils.config import ScraperConfig
+from utils.storage_backends import create_storage
+
+logger = logging.getLogger(__name__)
+
+# 進度推送間隔（秒）
+PROGRESS_INTERVAL = 1.0
+
+# 保留的已結束任務數，超過時移除最舊的
+MAX_FINISHED_JOBS = int(os.getenv('MAX_FINISHED_JOBS', '50'))
+
+
+class ScrapeJob:
+    """一次背景爬蟲任務"""
+
+    def __init__(self, mode, limit=None, resume=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.limit = limit
+        self.resume = resume
+        self.status = 'queued'
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.scraper = None
+        self.task = None
+
+    @property
+    def done(self):
+        return self.status in ('finished', 'failed')
+
+    def get_progress(self):
+        """任務狀態、爬蟲統計與吞吐量"""
+        progress = {
+            'id': self.id,
+            'mode': self.mode,
+            'limit': self.limit,
+            'resume': self.resume,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if self.scraper is None:
+            return progress
+
+        stats = self.scraper.state.get_stats()
+        if self.finished_at:
+            stats['elapsed_time'] = self.finished_at - self.started_at
+        elapsed = max(stats['elapsed_time'], 1e-6)
+        progress['stats'] = stats
+        progress['throughput'] = {
+            'products_per_min': stats['products'] / elapsed * 60,
+            'specs_per_min': stats['specs'] / elapsed * 60,
+            'reviews_per_min': stats['reviews'] / elapsed * 60,
+        }
+        progress['cache'] = self.scraper.cache.get_stats()
+        progress['queues'] = {
+            'products': self.scraper.product_queue.qsize(),
+            'boards': self.scraper.board_detail_queue.qsize(),
+            'parse': self.scraper.parse_queue.qsize(),
+            'persist': self.scraper.persist_queue.qsize(),
+            'reviews': self.scraper.board_queue.qsize(),
+        }
+        return progress
+
+
+class ScraperService:
+    """管理爬蟲任務：同一時間只允許一個任務執行"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.current = None
+
+    def start_job(self, mode, limit=None, resume=False):
+        """啟動新任務；已有任務執行中時返回 None"""
+        if self.current and not self.current.done:
+            return None
+
+        self._prune_jobs()
+        job = ScrapeJob(mode, limit, resume)
+        self.jobs[job.id] = job
+        self.current = job
+        job.task = asyncio.create_task(self._run_job(job))
+        return job
+
+    def _prune_jobs(self):
+        """只保留最近 MAX_FINISHED_JOBS 個已結束的任務"""
+        finished = sorted((job for job in self.jobs.values() if job.done), key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.id]
+
+    async def _run_job(self, job):
+        try:
+            config = ScraperConfig(mode=job.mode, limit=job.limit)
+            # 只有連接資料庫會阻塞，放到執行緒中避免卡住事件迴圈與 SSE 推送；
+            # 爬蟲本身須在事件迴圈執行緒建立，進度紀錄的 SQLite 連線只能在建立它的執行緒使用
+            db = await asyncio.to_thread(
+                create_storage, config.storage, path=config.storage_path, pool_size=config.db_pool_size
+            )
+            job.scraper = GPUScraper.from_config(config, db=db)
+            job.status = 'running'
+            job.started_at = time.time()
+            logger.info(f"開始爬蟲任務 {job.id} (mode={job.mode}, limit={job.limit})")
+
+            if await job.scraper.run(job.limit, mode=job.mode, resume=job.resume):
+                job.status = 'finished'
+            else:
+                job.status = 'failed'
+                job.error = job.scraper.error
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            logger.error(f"爬蟲任務 {job.id} 失敗: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+            if job.started_at is None:
+                job.started_at = job.finished_at
+            logger.info(f"爬蟲任務 {job.id} 結束，狀態: {job.status}")
+
+
+async def run_scraper(request):
+    """啟動爬蟲：預設只爬尚未爬取的顯卡，?mode=full 更新所有資料，?resume=1 從上次中斷處繼續"""
+    service = request.app['service']
+    mode = request.query.get('mode', 'incremental')
+    if mode not in ('full', 'incremental'):
+        return web.json_response({'error': f'不支援的 mode: {mode}'}, status=400)
+
+    limit = request.query.get('limit')
+    try:
+        limit = int(limit) if limit else None
+    except ValueError:
+        return web.json_response({'error': f'limit 必須是整數: {limit}'}, status=400)
+
+    resume = request.query.get('resume', '').lower() in ('1', 'true', 'yes')
+    job = service.start_job(mode, limit, resume)
+    if job is None:
+        return web.json_response({
+            'error': '已有爬蟲任務執行中',
+            'job': service.current.get_progress(),
+        }, status=409)
+
+    return web.json_response({
+        'job': job.get_progress(),
+        'events': f'/jobs/{job.id}/events',
+    }, status=202)
+
+
+async def list_jobs(request):
+    service = request.app['service']
+    return web.json_response({'jobs': [job.get_progress() for job in service.jobs.values()]})
+
+
+def _get_job(request):
+    job = request.app['service'].jobs.get(request.match_info['job_id'])
+    if job is None:
+        raise web.HTTPNotFound(text=json.dumps({'error': '找不到任務'}), content_type='application/json')
+    return job
+
+
+async def get_job(request):
+    return web.json_response(_get_job(request).get_progress())
+
+
+async def job_events(request):
+    """以 Server-Sent Events 推送任務進度，直到任務結束"""
+    job = _get_job(request)
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+    })
+    await response.prepare(request)
+
+    while True:
+        progress = job.get_progress()
+        event = 'done' if job.done else 'progress'
+        await response.write(f"event: {event}\ndata: {json.dumps(progress, ensure_ascii=False)}\n\n".encode('utf-8'))
+        if job.done:
+            break
+        await asyncio.sleep(PROGRESS_INTERVAL)
+
+    return response
+
+
+def create_app():
+    app = web.Application()
+    app['service'] = ScraperService()
+    app.router.add_get('/run-scraper', run_scraper)
+    app.router.add_get('/jobs', list_jobs)
+    app.router.add_get('/jobs/{job_id}', get_job)
+    app.router.add_get('/jobs/{job_id}/events', job_events)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host=os.getenv('SERVER_HOST', '0.0.0.0'), port=int(os.getenv('SERVER_PORT', '8000')))
@@ -0,0 +1,109 @@
+"""html.parser 與 lxml 兩種解析後端對保存的頁面必須產生相同結果"""
+import os
+
+import pytest
+
+pytest.importorskip('bs4')
+pytest.importorskip('lxml')
+
+from utils.parsers import GPUParser  # noqa: E402
+from utils.stream_parser import ReviewStreamParser, extract_list_page, extract_product_rows  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+GPU_URL = 'https://www.techpowerup.com/gpu-specs/geforce-rtx-4090.c3889'
+BOARD_URL = 'https://www.techpowerup.com/gpu-specs/asus-rog-strix-rtx-4090-oc.b10030'
+
+LIST_FACETS = ('mfgr', 'released')
+
+REVIEW_PAGES = [
+    ('review_pcb.html', 'Circuit Board Analysis'),
+    ('review_temps.html', 'Temperatures & Fan noise'),
+    ('review_oc.html', 'Overclocking & Power Limits'),
+    ('review_pcb.html', 'Pictures & Teardown'),
+]
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def run_with_backend(backend, func, *args):
+    """以指定解析後端執行解析入口"""
+    previous = GPUParser.backend
+    GPUParser.backend = backend
+    try:
+        return func(*args)
+    finally:
+        GPUParser.backend = previous
+
+
+CASES = [
+    ('product_list', lambda: GPUParser._extract_product_rows_soup(GPUParser.make_soup(load_fixture('gpu_list.html')))),
+    ('list_facets', lambda: GPUParser._extract_list_facets_soup(GPUParser.make_soup(load_fixture('gpu_list.html')), LIST_FACETS)),
+    ('product_page', lambda: GPUParser.parse_product_page(load_fixture('gpu_detail.html'), GPU_URL)),
+    ('product_detail', lambda: GPUParser.parse_product_detail(load_fixture('gpu_detail.html'), GPU_URL)),
+    ('boards_section', lambda: GPUParser.parse_boards_section(load_fixture('gpu_detail.html'))),
+    ('board_details', lambda: GPUParser.parse_board_details(load_fixture('board_detail.html'), BOARD_URL)),
+    ('review_options', lambda: GPUParser.parse_review_options(load_fixture('review_index.html'))),
+] + [
+    (f'review_content[{name}:{review_type}]',
+     lambda name=name, review_type=review_type: GPUParser.parse_review_content(load_fixture(name), review_type))
+    for name, review_type in REVIEW_PAGES
+]
+
+
+@pytest.mark.parametrize('name,parse', CASES, ids=[name for name, _ in CASES])
+def test_backends_produce_identical_output(name, parse):
+    expected = run_with_backend('html.parser', parse)
+    assert expected, f'{name} 在保存頁面上沒有解析出任何內容'
+    assert run_with_backend('lxml', parse) == expected
+
+
+def test_fast_product_list_matches_dom():
+    html = load_fixture('gpu_list.html')
+    expected = GPUParser._extract_product_rows_soup(GPUParser.make_soup(html, 'html.parser'))
+    assert [name for name, _, _ in expected] == ['GeForce RTX 4090', 'Radeon RX 7900 XTX', 'Arc A770']
+    assert extract_product_rows(html) == expected
+    assert GPUParser.parse_product_rows(html) == expected
+
+
+@pytest.mark.parametrize('chunk_size', [1, 17, 65536])
+def test_fast_list_page_collects_facets(chunk_size):
+    html = load_fixture('gpu_list.html')
+    soup = GPUParser.make_soup(html, 'html.parser')
+    facets = GPUParser._extract_list_facets_soup(soup, LIST_FACETS)
+    assert facets == {'mfgr': ['AMD', 'Intel', 'NVIDIA'], 'released': ['2024', '2023']}
+    expected = (GPUParser._extract_product_rows_soup(soup), facets)
+    assert extract_list_page(html, LIST_FACETS, chunk_size=chunk_size) == expected
+    assert GPUParser.parse_list_page(html, LIST_FACETS) == expected
+
+
+@pytest.mark.parametrize('name,review_type', REVIEW_PAGES)
+@pytest.mark.parametrize('chunk_size', [1, 17, 65536])
+def test_streaming_review_matches_dom(name, review_type, chunk_size):
+    html = load_fixture(name)
+    expected = run_with_backend('html.parser', GPUParser.parse_review_content, html, review_type)
+
+    stream = ReviewStreamParser(with_tables=GPUParser.review_needs_tables(review_type))
+    stream.reset('utf-8')
+    data = html.encode('utf-8')
+    for start in range(0, len(data), chunk_size):
+        stream.feed(data[start:start + chunk_size])
+    assert GPUParser.build_review_content(stream.close(), review_type) == expected
+
+
+def test_pcb_review_fields():
+    _, review_data = GPUParser.parse_review_content(load_fixture('review_pcb.html'), 'Circuit Board Analysis')
+    values = {(row['data_type'], row['data_key']): row['data_value'] for row in review_data if row['data_type'] != 'Image'}
+    assert values == {
+        ('GPU', 'MEM項數'): '18+3',
+        ('GPU', '控制器型號'): 'MP2891',
+        ('GPU', 'MOS規格'): 'Alpha Omega AOZ5311NQI DrMOS 70A',
+        ('Memory', 'MEM項數'): '3+1',
+        ('Memory', '控制器型號'): 'MP2888A',
+        ('Memory', '記憶體型號'): 'Micron D8BZC 21',
+        ('Weight', 'weight'): '2314',
+        ('Heatpipes', 'count'): '8',
+    }
+
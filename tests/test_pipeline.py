@@ -0,0 +1,99 @@
+"""以保存頁面組成的回放封存檔離線執行完整爬蟲流程（SQLite 存儲）"""
+import asyncio
+import os
+import sqlite3
+from urllib.parse import urljoin
+
+import pytest
+
+pytest.importorskip('aiohttp')
+pytest.importorskip('bs4')
+pytest.importorskip('colorama')
+pytest.importorskip('dotenv')
+pytest.importorskip('fake_useragent')
+
+from scraper import GPUScraper  # noqa: E402
+from server import ScraperService  # noqa: E402
+from utils.config import ScraperConfig  # noqa: E402
+from utils.replay import ResponseRecorder  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+BASE_URL = 'https://www.techpowerup.com'
+REVIEW_PATH = '/review/asus-geforce-rtx-4090-strix-oc/'
+
+# 網址 -> 保存頁面；三個 GPU 共用同一份詳情頁，其主板與評測只會處理一次
+PAGES = {
+    '/gpu-specs/': 'gpu_list.html',
+    '/gpu-specs/geforce-rtx-4090.c3889': 'gpu_detail.html',
+    '/gpu-specs/radeon-rx-7900-xtx.c3941': 'gpu_detail.html',
+    '/gpu-specs/arc-a770.c3914': 'gpu_detail.html',
+    '/gpu-specs/asus-rog-strix-rtx-4090-oc.b10030': 'board_detail.html',
+    '/gpu-specs/msi-rtx-4090-gaming-x-trio.b10041': 'board_detail.html',
+    REVIEW_PATH: 'review_index.html',
+    REVIEW_PATH + '3.html': 'review_pcb.html',
+    REVIEW_PATH + '4.html': 'review_pcb.html',
+    REVIEW_PATH + '38.html': 'review_temps.html',
+    REVIEW_PATH + '39.html': 'review_oc.html',
+}
+
+
+@pytest.fixture
+def replay_env(tmp_path, monkeypatch):
+    """建立回放封存檔，並以環境變數讓爬蟲只使用暫存目錄"""
+    archive = str(tmp_path / 'replay.jsonl.gz')
+    recorder = ResponseRecorder(archive)
+    for path, name in PAGES.items():
+        with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+            recorder.record(urljoin(BASE_URL, path), f.read())
+    recorder.close()
+
+    env = {
+        'BASE_URL': BASE_URL,
+        'REPLAY_PATH': archive,
+        'STORAGE_BACKEND': 'sqlite',
+        'STORAGE_PATH': str(tmp_path / 'gpu.sqlite3'),
+        'CHECKPOINT_PATH': str(tmp_path / 'crawl.sqlite3'),
+        'HTTP_CACHE_DIR': str(tmp_path / 'cache'),
+        'DISCOVERY_MODE': 'default',
+        'PARSE_WORKERS': '0',
+    }
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return env
+
+
+def count_rows(path, table):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_run_returns_true_on_replayed_corpus(replay_env):
+    scraper = GPUScraper.from_config(ScraperConfig())
+    assert asyncio.run(scraper.run(mode='full')) is True
+    assert scraper.error is None
+
+    stats = scraper.state.get_stats()
+    assert stats['reviews'] == 4
+    # 3 個 GPU 與 2 張主板
+    assert count_rows(replay_env['STORAGE_PATH'], 'C_Product') == 5
+
+
+def test_run_returns_false_when_no_products_found(replay_env, monkeypatch):
+    # 封存檔中沒有此主機的列表頁
+    monkeypatch.setenv('BASE_URL', 'https://example.invalid')
+    scraper = GPUScraper.from_config(ScraperConfig())
+    assert asyncio.run(scraper.run(mode='full')) is False
+    assert scraper.error
+
+
+def test_service_job_finishes(replay_env):
+    async def run_job():
+        service = ScraperService()
+        job = service.start_job('full')
+        await job.task
+        return job
+
+    job = asyncio.run(run_job())
+    assert job.status == 'finished', job.error
+    assert job.error is None
+    assert job.get_progress()['stats']['reviews'] == 4
@@ -5,6 +5,8 @@ from fake_useragent import UserAgent
 import logging
 import os
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
 
 # 設定日誌
 logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
@@ -22,14 +24,105 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+class HostRateLimiter:
+    """單一主機的 AIMD 速率控制：成功時緩慢加速，被限流或出錯時倍數減速"""
+    
+    def __init__(self, rate, min_rate, max_rate, increase_step=0.05, increase_after=10):
+        self.rate = rate  # 目前每秒請求數
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.increase_after = increase_after  # 連續成功幾次後加速
+        self.success_streak = 0
+        self.next_time = 0.0  # 下一個可用時段
+        self.blocked_until = 0.0  # Retry-After 指定的暫停時間
+        self.lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """等待下一個可用的請求時段"""
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            now = loop.time()
+            start = max(now, self.next_time, self.blocked_until)
+            self.next_time = start + 1.0 / self.rate
+        
+        delay = start - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+    
+    def on_success(self):
+        """回應正常：累積足夠次數後線性加速"""
+        self.success_streak += 1
+        if self.success_streak >= self.increase_after and self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+            self.success_streak = 0
+            logger.debug(f"提高請求速率至 {self.rate:.2f} 次/秒")
+    
+    def on_error(self, factor=0.7):
+        """請求失敗：倍數減速"""
+        self.success_streak = 0
+        self.rate = max(self.min_rate, self.rate * factor)
+        logger.warning(f"降低請求速率至 {self.rate:.2f} 次/秒")
+    
+    def on_throttle(self, retry_after=None):
+        """收到 429/503：速率減半並依 Retry-After 暫停"""
+        self.on_error(factor=0.5)
+        if retry_after:
+            loop = asyncio.get_running_loop()
+            self.blocked_until = max(self.blocked_until, loop.time() + retry_after)
+            logger.warning(f"伺服器要求暫停 {retry_after:.0f} 秒")
+
 class AntiCrawl:
     
-    def __init__(self):
+    def __init__(self, rate=None, min_rate=None):
         self.ua = UserAgent()
         self.min_delay = 3
         self.max_delay = 7
         self.retry_delays = [5, 10, 20, 30, 60, 120]
         self.max_retries = len(self.retry_delays)
+        
+        # 每個主機的目標請求速率（次/秒）與下限
+        self.rate = rate or float(os.getenv('RATE_LIMIT', '0.5'))
+        self.min_rate = min_rate or float(os.getenv('RATE_LIMIT_MIN', '0.05'))
+        self.limiters = {}
+    
+    def get_limiter(self, url):
+        """取得（或建立）URL 所屬主機的速率控制器，所有工作協程共用"""
+        host = urlparse(url).netloc
+        limiter = self.limiters.get(host)
+        if limiter is None:
+            limiter = HostRateLimiter(self.rate, min(self.min_rate, self.rate), self.rate)
+            self.limiters[host] = limiter
+        return limiter
+    
+    async def acquire(self, url):
+        """請求前等待該主機的可用時段"""
+        return await self.get_limiter(url).acquire()
+    
+    def record_success(self, url):
+        self.get_limiter(url).on_success()
+    
+    def record_error(self, url):
+        self.get_limiter(url).on_error()
+    
+    def record_throttle(self, url, retry_after=None):
+        self.get_limiter(url).on_throttle(self.parse_retry_after(retry_after))
+    
+    @staticmethod
+    def parse_retry_after(value):
+        """解析 Retry-After（秒數或 HTTP 日期），無法解析時返回 None"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
     
     def get_headers(self):
         """生成隨機 User-Agent 和其他頭部信息"""
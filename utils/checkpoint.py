@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 每個工作項目依序經過的狀態
+CHECKPOINT_STATUSES = ('queued', 'fetched', 'parsed', 'stored')
+
+
+class CheckpointStore:
+    """以 SQLite 記錄每個 GPU、主板與評測的處理進度，供中斷後續爬"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        # WAL 模式下每次提交只追加日誌，行程中斷也不會損壞已記錄的進度
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+        """)
+        self.conn.commit()
+
+    def reset(self):
+        """清除所有進度（非續爬模式時使用）"""
+        self.conn.execute('DELETE FROM checkpoints')
+        self.conn.commit()
+        logger.info(f"已清除爬蟲進度紀錄: {self.path}")
+
+    def mark(self, kind, key, status, payload=None):
+        """記錄項目狀態；payload 為 None 時保留原本的內容"""
+        if status not in CHECKPOINT_STATUSES:
+            raise ValueError(f"未知的進度狀態: {status}")
+
+        self.conn.execute("""
+            INSERT INTO checkpoints (kind, key, status, payload, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (kind, key) DO UPDATE SET
+                status = excluded.status,
+                payload = COALESCE(excluded.payload, checkpoints.payload),
+                updated_at = excluded.updated_at
+        """, (
+            kind, key, status,
+            json.dumps(payload, ensure_ascii=False) if payload is not None else None,
+            time.time()
+        ))
+        self.conn.commit()
+
+    def completed(self, kind):
+        """已完成存儲的項目鍵值"""
+        rows = self.conn.execute(
+            "SELECT key FROM checkpoints WHERE kind = ? AND status = 'stored'", (kind,)
+        )
+        return {row[0] for row in rows}
+
+    def pending(self, kind):
+        """尚未完成的項目內容"""
+        rows = self.conn.execute(
+            "SELECT payload FROM checkpoints WHERE kind = ? AND status != 'stored' AND payload IS NOT NULL ORDER BY updated_at",
+            (kind,)
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def get_stats(self):
+        """各類項目的狀態統計"""
+        stats = {}
+        for kind, status, count in self.conn.execute(
+            'SELECT kind, status, COUNT(*) FROM checkpoints GROUP BY kind, status'
+        ):
+            stats.setdefault(kind, {})[status] = count
+        return stats
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,104 @@
+import os
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 設定項目：(名稱, 環境變數, 型別, 預設值, 說明)
+CONFIG_OPTIONS = [
+    ('limit', 'SCRAPER_LIMIT', int, None, '限制爬取的 GPU 數量（用於測試）'),
+    ('mode', 'SCRAPER_MODE', str, 'full', 'full 全部重爬，incremental 只爬新的或已變更的 GPU'),
+    ('discovery', 'DISCOVERY_MODE', str, 'facets', 'default 只抓 1 個預設列表頁（有筆數上限）；facets 依廠商 × 發表年份探索完整目錄，約 330 個列表頁，預設速率下約需 11 分鐘'),
+    ('discovery_workers', 'DISCOVERY_WORKERS', int, 3, '同時抓取的列表分頁數'),
+    ('fetch_workers', 'FETCH_WORKERS', int, 3, '抓取階段工作協程數'),
+    ('parse_workers', 'PARSE_WORKERS', int, min(4, os.cpu_count() or 1), '解析行程數，0 表示在事件迴圈中直接解析'),
+    ('persist_workers', 'PERSIST_WORKERS', int, 3, '存儲階段工作協程數'),
+    ('review_workers', 'REVIEW_WORKERS', int, 3, '評測階段工作協程數'),
+    ('queue_size', 'QUEUE_SIZE', int, 50, '管線佇列上限'),
+    ('rate_limit', 'RATE_LIMIT', float, 0.5, '每個主機的目標請求速率（次/秒）'),
+    ('rate_limit_min', 'RATE_LIMIT_MIN', float, 0.05, '被限流時的最低請求速率（次/秒）'),
+    ('cache_dir', 'HTTP_CACHE_DIR', str, None, 'HTTP 回應快取目錄'),
+    ('parser_backend', 'PARSER_BACKEND', str, None, 'HTML 解析後端 (html.parser / lxml)'),
+    ('storage', 'STORAGE_BACKEND', str, 'sqlserver', '存儲後端 (sqlserver / sqlite / parquet)'),
+    ('storage_path', 'STORAGE_PATH', str, None, 'SQLite 檔案或 Parquet 輸出目錄路徑'),
+    ('stream_reviews', 'STREAM_REVIEWS', bool, False, '評測頁面以 lxml 增量解析，不建立完整 DOM'),
+    ('db_pool_size', 'DB_POOL_SIZE', int, 5, '資料庫連線池大小'),
+    ('checkpoint_path', 'CHECKPOINT_PATH', str, None, '續爬進度紀錄檔路徑'),
+    ('resume', 'SCRAPER_RESUME', bool, False, '從上次中斷處繼續爬取'),
+    ('record_path', 'RECORD_PATH', str, None, '錄製所有回應到此封存檔 (.jsonl.gz)'),
+    ('replay_path', 'REPLAY_PATH', str, None, '從此封存檔回放回應，不連線到網站'),
+    ('replay_latency', 'REPLAY_LATENCY', float, 0.0, '回放時每個請求模擬的延遲（秒）'),
+]
+
+OPTION_CHOICES = {
+    'mode': ['full', 'incremental'],
+    'discovery': ['default', 'facets'],
+    'parser_backend': ['html.parser', 'lxml'],
+    'storage': ['sqlserver', 'sqlite', 'parquet'],
+}
+
+
+def _parse_env(value, cast):
+    """將環境變數字串轉為設定型別"""
+    if cast is bool:
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return cast(value)
+
+
+class ScraperConfig:
+    """爬蟲執行設定，優先順序：命令列參數 > 環境變數 > 預設值"""
+
+    def __init__(self, **values):
+        for name, env, cast, default, _ in CONFIG_OPTIONS:
+            value = values.get(name)
+            if value is None and os.getenv(env):
+                value = _parse_env(os.getenv(env), cast)
+            setattr(self, name, value if value is not None else default)
+
+        for name, choices in OPTION_CHOICES.items():
+            value = getattr(self, name)
+            if value is not None and value not in choices:
+                raise ValueError(f"{name} 必須是 {', '.join(choices)} 之一，收到: {value}")
+
+    @property
+    def stage_workers(self):
+        """各管線階段的工作協程數"""
+        return {
+            'fetch': self.fetch_workers,
+            'parse': max(1, self.parse_workers),
+            'persist': self.persist_workers,
+            'review': self.review_workers,
+        }
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name, *_ in CONFIG_OPTIONS}
+
+    @staticmethod
+    def build_arg_parser():
+        """建立命令列參數解析器，每個設定項目對應一個 --選項"""
+        parser = argparse.ArgumentParser(description='TechPowerUp GPU 爬蟲')
+        for name, env, cast, default, help_text in CONFIG_OPTIONS:
+            if cast is bool:
+                # 布林設定為旗標，未指定時為 None 以便讀取環境變數
+                parser.add_argument(
+                    f"--{name.replace('_', '-')}",
+                    dest=name,
+                    action='store_const',
+                    const=True,
+                    help=f'{help_text}（環境變數 {env}）'
+                )
+                continue
+            parser.add_argument(
+                f"--{name.replace('_', '-')}",
+                dest=name,
+                type=cast,
+                choices=OPTION_CHOICES.get(name),
+                help=f'{help_text}（環境變數 {env}，預設 {default}）'
+            )
+        return parser
+
+    @classmethod
+    def from_args(cls, argv=None):
+        """從命令列參數（未指定時讀取環境變數）建立設定"""
+        args = cls.build_arg_parser().parse_args(argv)
+        return cls(**vars(args))
@@ -3,18 +3,212 @@ import logging
 import pyodbc
 import re
 import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from dotenv import load_dotenv
+from utils.storage_backends import StorageBackend, SOURCE_URL_SPEC, FINGERPRINT_SPEC
 
 # 載入環境變數
 load_dotenv(dotenv_path='./.env')
 
 logger = logging.getLogger(__name__)
 
-class Database:
+
+class ConnectionPool:
+    """有上限的 pyodbc 連線池，提供 checkout/checkin 介面"""
+
+    def __init__(self, connection_string, size=5, timeout=30):
+        self.connection_string = connection_string
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _new_connection(self):
+        """建立新的連線（autocommit 關閉，由各操作自行提交）"""
+        return pyodbc.connect(self.connection_string, autocommit=False)
+
+    def checkout(self):
+        """取出一條連線，池滿時等待其他執行緒歸還"""
+        if self._closed:
+            raise RuntimeError("連線池已關閉")
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._new_connection()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"等待資料庫連線逾時 ({self.timeout} 秒)")
+
+    def checkin(self, conn, discard=False):
+        """歸還連線；發生錯誤的連線會被丟棄並釋放名額"""
+        if not discard and not self._closed:
+            try:
+                # 清除未提交的狀態，避免污染下一個使用者
+                conn.rollback()
+                self._idle.put(conn)
+                return
+            except pyodbc.Error as e:
+                logger.warning(f"連線已失效，將其丟棄: {str(e)}")
+
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def connection(self):
+        """以 with 區塊使用連線，離開時自動歸還"""
+        conn = self.checkout()
+        discard = False
+        try:
+            yield conn
+        except pyodbc.OperationalError:
+            discard = True
+            raise
+        finally:
+            self.checkin(conn, discard=discard)
+
+    def close_all(self):
+        """關閉所有閒置連線"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except pyodbc.Error:
+                pass
+            with self._lock:
+                self._created -= 1
+
+
+class CategoryRegistry:
+    """S_Flag 中 'GPU 規格參數' 類別的記憶體快取，啟動時一次載入，所有寫入路徑共用"""
+
+    FLAG_TYPE = 'GPU 規格參數'
+
     def __init__(self):
-        self.conn = None
-        self.cursor = None
+        self._entries = {}  # 類別名稱 -> (F_SeqNo, F_ID)
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def get(self, name):
+        """返回類別的 F_ID，不存在時返回 None"""
+        entry = self._entries.get(name)
+        return entry[1] if entry else None
+
+    def get_entry(self, name):
+        return self._entries.get(name)
+
+    def load(self, cursor):
+        """以單一查詢載入全部類別"""
+        cursor.execute("SELECT F_Name, F_SeqNo, F_ID FROM dbo.S_Flag WHERE F_Type = ?", (self.FLAG_TYPE,))
+        entries = {}
+        for name, seq_no, flag_id in cursor.fetchall():
+            entries.setdefault(name, (seq_no, flag_id))
+        with self._lock:
+            self._entries = entries
+        logger.info(f"載入 {len(entries)} 個規格類別")
+
+    def register(self, entries):
+        """事務提交後將新類別加入快取"""
+        with self._lock:
+            for name, entry in entries.items():
+                self._entries.setdefault(name, entry)
+
+    def resolve(self, cursor, category_names, now):
+        """在呼叫端的事務中解析類別 ID，缺少的類別以應用程式鎖序列化配置
+
+        返回 (名稱 -> F_ID, 新建或從資料庫補回的項目)；後者須在提交後交給 register。
+        """
+        missing = [name for name in category_names if name not in self._entries]
+        created = {}
+        if missing:
+            # 鎖定至事務結束，其他行程或執行緒的配置會等待並看到本次建立的類別
+            cursor.execute(
+                "DECLARE @r int; "
+                "EXEC @r = sp_getapplock @Resource = ?, @LockMode = 'Exclusive', @LockOwner = 'Transaction', @LockTimeout = 30000; "
+                "SELECT @r",
+                (f'S_Flag:{self.FLAG_TYPE}',)
+            )
+            # 負值表示逾時、被選為死結犧牲者或參數錯誤，未持有鎖時不可配置 ID，交由呼叫端回滾
+            result = cursor.fetchone()[0]
+            if result < 0:
+                raise RuntimeError(f"取得規格類別配置鎖失敗 (sp_getapplock 返回 {result})")
+            
+            # 取得鎖後重新確認，可能已由其他寫入者建立
+            placeholders = ', '.join(['?' for _ in missing])
+            cursor.execute(
+                f"SELECT F_Name, F_SeqNo, F_ID FROM dbo.S_Flag WHERE F_Type = ? AND F_Name IN ({placeholders})",
+                [self.FLAG_TYPE, *missing]
+            )
+            for name, seq_no, flag_id in cursor.fetchall():
+                created.setdefault(name, (seq_no, flag_id))
+            
+            to_insert = [name for name in missing if name not in created]
+            if to_insert:
+                cursor.execute(
+                    "SELECT MAX(CAST(F_ID AS INT)) FROM dbo.S_Flag WHERE F_Type = ?",
+                    (self.FLAG_TYPE,)
+                )
+                max_id = int(cursor.fetchone()[0] or 0)
+                
+                rows = []
+                for offset, name in enumerate(to_insert, 1):
+                    rows.append((now, now, '1', 'admin', 'S', self.FLAG_TYPE, str(max_id + offset), name))
+                values = ', '.join(['(?, ?, ?, ?, ?, ?, ?, ?)' for _ in rows])
+                cursor.execute(f"""
+                    INSERT INTO dbo.S_Flag (
+                        F_Createdate, F_UpdateTime, F_Stat, F_Keyin, F_Security, 
+                        F_Type, F_ID, F_Name
+                    ) OUTPUT INSERTED.F_Name, INSERTED.F_SeqNo, INSERTED.F_ID
+                    VALUES {values}
+                """, [value for row in rows for value in row])
+                for name, seq_no, flag_id in cursor.fetchall():
+                    created[name] = (seq_no, flag_id)
+                logger.info(f"建立 {len(to_insert)} 個新規格類別: {', '.join(to_insert)}")
+        
+        categories = {}
+        for name in category_names:
+            entry = self._entries.get(name) or created[name]
+            categories[name] = entry[1]
+        return categories, created
+
+
+class Database(StorageBackend):
+    """SQL Server 存儲後端"""
+
+    def __init__(self, pool_size=None, executor_workers=None):
+        # 連線池大小與專用執行緒數，預設讀取環境變數
+        self.pool_size = pool_size or int(os.getenv('DB_POOL_SIZE', '5'))
+        self.executor_workers = executor_workers or int(os.getenv('DB_EXECUTOR_WORKERS', str(self.pool_size)))
+        self.pool = None
+        self.executor = None
+        self.categories = CategoryRegistry()  # 規格類別快取
         self.connect_to_db()
     
     def connect_to_db(self):
@@ -34,56 +228,63 @@ class Database:
 
             connection_string = f'DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server};DATABASE={database};Trusted_Connection={trusted_connection}'
 
-            conn = pyodbc.connect(connection_string)
+            self.pool = ConnectionPool(connection_string, size=self.pool_size)
+            self.executor = ThreadPoolExecutor(max_workers=self.executor_workers, thread_name_prefix='db')
             
-            # 嘗試連接
-            self.conn = pyodbc.connect(connection_string)
-            self.cursor = self.conn.cursor()
+            # 嘗試連接，確認設定正確，並一次載入全部規格類別
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self.categories.load(cursor)
+                cursor.close()
             
-            logger.info("資料庫連接成功")
+            logger.info(f"資料庫連接成功 (連線池: {self.pool_size}, 執行緒: {self.executor_workers})")
         except Exception as e:
             logger.error(f"資料庫連接失敗: {str(e)}")
             raise
     
     async def disconnect(self):
         """關閉資料庫連接"""
-        if self.cursor:
-            self.cursor.close()
-        if self.conn:
-            self.conn.close()
+        if self.executor:
+            self.executor.shutdown(wait=True)
+        if self.pool:
+            self.pool.close_all()
             logger.info("資料庫連接已關閉")
     
     # 一個工具函數來將數據庫操作封裝為非同步形式
     async def run_db_query(self, query_func, *args, **kwargs):
-        """執行同步數據庫查詢，並使其表現為非同步"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, lambda: query_func(*args, **kwargs))
+        """在專用執行緒中取出獨立連線執行同步查詢，並使其表現為非同步
+
+        query_func 的前兩個參數為本次呼叫專用的 conn 與 cursor。
+        """
+        def _run():
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    return query_func(conn, cursor, *args, **kwargs)
+                finally:
+                    cursor.close()
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _run)
     
     async def execute_transaction(self, query_func, *args, **kwargs):
         """在事務中執行一系列資料庫操作"""
-        def _execute_transaction():
+        def _execute_transaction(conn, cursor):
             try:
-                # 開始事務
-                self.conn.autocommit = False
-                result = query_func(*args, **kwargs)
-                self.conn.commit()
+                result = query_func(conn, cursor, *args, **kwargs)
+                conn.commit()
                 return result
             except Exception as e:
-                self.conn.rollback()
+                conn.rollback()
                 logger.error(f"事務執行失敗: {str(e)}")
                 raise
-            finally:
-                # 恢復自動提交
-                self.conn.autocommit = True
         
         return await self.run_db_query(_execute_transaction)
     
     async def create_product(self, product_data):
         """創建產品記錄"""
-        def _create_product():
+        def _create_product(conn, cursor):
             try:
-                self.cursor = self.conn.cursor()
-
                 now = datetime.now()
                 
                 # 準備插入數據
@@ -105,9 +306,9 @@ class Database:
                 sql = f"INSERT INTO dbo.C_Product ({columns}) OUTPUT INSERTED.F_SeqNo VALUES ({placeholders})"
                 
                 # 執行插入並獲取新生成的 ID
-                self.cursor.execute(sql, list(insert_data.values()))
-                new_id = self.cursor.fetchone()[0]
-                self.conn.commit()
+                cursor.execute(sql, list(insert_data.values()))
+                new_id = cursor.fetchone()[0]
+                conn.commit()
                 
                 # 構建返回的產品對象
                 product = type('Product', (), {"F_SeqNo": new_id, "F_Product": product_data.get("F_Product", "")})
@@ -115,7 +316,7 @@ class Database:
                 logger.info(f"產品記錄創建成功: {product.F_Product}, ID: {new_id}")
                 return product
             except Exception as e:
-                self.conn.rollback()
+                conn.rollback()
                 logger.error(f"產品記錄創建失敗: {str(e)}")
                 raise
         
@@ -123,50 +324,25 @@ class Database:
     
     async def create_spec_category(self, category_name):
         """創建或獲取規格類別"""
-        def _create_spec_category():
+        def _create_spec_category(conn, cursor):
             try:
-                self.cursor = self.conn.cursor()
-
                 now = datetime.now()
                 
-                # 檢查是否已存在
-                sql = "SELECT F_SeqNo, F_ID FROM dbo.S_Flag WHERE F_Type = ? AND F_Name = ?"
-                self.cursor.execute(sql, ('GPU 規格參數', category_name))
-                existing = self.cursor.fetchone()
+                # 先查記憶體快取
+                entry = self.categories.get_entry(category_name)
+                if entry:
+                    return type('Category', (), {"F_SeqNo": entry[0], "F_ID": entry[1], "F_Name": category_name})
                 
-                if existing:
-                    logger.info(f"規格類別已存在: {category_name} (ID: {existing[1]})")
-                    return type('Category', (), {"F_SeqNo": existing[0], "F_ID": existing[1], "F_Name": category_name})
+                # 不存在時以共用的類別配置建立
+                _, created = self.categories.resolve(cursor, [category_name], now)
+                conn.commit()
+                self.categories.register(created)
                 
-                # 獲取最大 ID
-                self.cursor.execute("SELECT MAX(CAST(F_ID AS INT)) FROM dbo.S_Flag WHERE F_Type = ?", ('GPU 規格參數',))
-                max_id = self.cursor.fetchone()[0]
-                
-                next_id = "1"
-                if max_id:
-                    next_id = str(int(max_id) + 1)
-                
-                # 創建新紀錄
-                sql = """
-                    INSERT INTO dbo.S_Flag (
-                        F_Createdate, F_UpdateTime, F_Stat, F_Keyin, F_Security, 
-                        F_Type, F_ID, F_Name
-                    ) OUTPUT INSERTED.F_SeqNo
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """
-                
-                self.cursor.execute(sql, (
-                    now, now, '1', 'admin', 'S',
-                    'GPU 規格參數', next_id, category_name
-                ))
-                
-                new_id = self.cursor.fetchone()[0]
-                self.conn.commit()
-                
-                logger.info(f"規格類別創建成功: {category_name} (ID: {next_id})")
-                return type('Category', (), {"F_SeqNo": new_id, "F_ID": next_id, "F_Name": category_name})
+                seq_no, flag_id = created[category_name]
+                logger.info(f"規格類別創建成功: {category_name} (ID: {flag_id})")
+                return type('Category', (), {"F_SeqNo": seq_no, "F_ID": flag_id, "F_Name": category_name})
             except Exception as e:
-                self.conn.rollback()
+                conn.rollback()
                 logger.error(f"規格類別創建失敗: {str(e)}")
                 raise
         
@@ -174,10 +350,8 @@ class Database:
     
     async def create_spec(self, product_id, category_id, spec_name, spec_value):
         """創建規格記錄"""
-        def _create_spec():
+        def _create_spec(conn, cursor):
             try:
-                self.cursor = self.conn.cursor()
-
                 now = datetime.now()
                 
                 sql = """
@@ -188,13 +362,13 @@ class Database:
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """
                 
-                self.cursor.execute(sql, (
+                cursor.execute(sql, (
                     now, now, '1', 'admin', 'S', 'admin',
                     'C_Product', str(product_id), category_id, spec_name, spec_value
                 ))
                 
-                new_id = self.cursor.fetchone()[0]
-                self.conn.commit()
+                new_id = cursor.fetchone()[0]
+                conn.commit()
                 
                 logger.debug(f"規格記錄創建成功: {spec_name}={spec_value}, 產品ID: {product_id}")
                 
@@ -205,7 +379,7 @@ class Database:
                     "F_Value": spec_value
                 })
             except Exception as e:
-                self.conn.rollback()
+                conn.rollback()
                 logger.error(f"規格記錄創建失敗: {str(e)}")
                 import traceback
                 logger.error(traceback.format_exc())
@@ -213,186 +387,264 @@ class Database:
         
         return await self.run_db_query(_create_spec)
     
-    async def create_review(self, product_id, review_type, title, desc):
-        """創建評測記錄"""
-        def _create_review():
-            try:
-                self.cursor = self.conn.cursor()
+    def _upsert_review_row(self, cursor, product_id, review_type, title, desc, now):
+        """以 (主檔 ID, 評測類型) 為鍵 upsert 評測記錄並清除其舊數據，返回評測 ID"""
+        cursor.execute("""
+            SELECT F_SeqNo, F_Title, F_Desc
+            FROM dbo.C_Product_Review WITH (UPDLOCK, HOLDLOCK)
+            WHERE F_Master_Table = 'C_Product' AND F_Master_ID = ? AND F_Type = ?
+        """, (str(product_id), review_type))
+        existing = cursor.fetchone()
+        
+        if existing:
+            review_id = existing[0]
+            if existing[1] != title or existing[2] != desc:
+                cursor.execute("""
+                    UPDATE dbo.C_Product_Review
+                    SET F_Title = ?, F_Desc = ?, F_UpdateTime = ?
+                    WHERE F_SeqNo = ?
+                """, (title, desc, now, review_id))
+                logger.info(f"評測內容已變更，更新記錄: {title}, 產品ID: {product_id}")
+            cursor.execute("DELETE FROM dbo.C_Product_Review_Data WHERE F_Review_ID = ?", (review_id,))
+            return review_id
+        
+        cursor.execute("""
+            INSERT INTO dbo.C_Product_Review (
+                F_Createdate, F_UpdateTime, F_Stat, F_Keyin, F_Security, F_Owner,
+                F_Master_Table, F_Master_ID, F_Type, F_Title, F_Desc
+            ) OUTPUT INSERTED.F_SeqNo
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            now, now, '1', 'admin', 'S', 'admin',
+            'C_Product', str(product_id), review_type, title, desc
+        ))
+        review_id = cursor.fetchone()[0]
+        logger.info(f"評測記錄創建成功: {title}, 產品ID: {product_id}")
+        return review_id
+    
+    async def store_review_with_data(self, product_id, review_type, title, desc, data_rows):
+        """在單一事務中寫入評測及其所有結構化數據
 
-                now = datetime.now()
-                
-                sql = """
-                    INSERT INTO dbo.C_Product_Review (
-                        F_Createdate, F_UpdateTime, F_Stat, F_Keyin, F_Security, F_Owner,
-                        F_Master_Table, F_Master_ID, F_Type, F_Title, F_Desc
-                    ) OUTPUT INSERTED.F_SeqNo
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """
-                
-                self.cursor.execute(sql, (
-                    now, now, '1', 'admin', 'S', 'admin',
-                    'C_Product', str(product_id), review_type, title, desc
-                ))
-                
-                new_id = self.cursor.fetchone()[0]
-                self.conn.commit()
+        data_rows 為 (F_Data_Type, F_Data_Key, F_Data_Value, F_Data_Unit, F_Product_Name) 的列表，
+        以 fast_executemany 一次寫入，再以單一查詢取回新數據的 ID。
+        """
+        def _store_review_with_data(conn, cursor):
+            try:
+                review_id = self._upsert_review_row(cursor, product_id, review_type, title, desc, datetime.now())
+                
+                data_ids = []
+                if data_rows:
+                    cursor.fast_executemany = True
+                    cursor.executemany("""
+                        INSERT INTO dbo.C_Product_Review_Data (
+                            F_Review_ID, F_Data_Type, F_Data_Key, F_Data_Value, F_Data_Unit, F_Product_Name
+                        )
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, [(review_id, *row) for row in data_rows])
+                    
+                    # 舊數據已在 upsert 時清除，此評測的數據即為剛寫入的列
+                    cursor.execute(
+                        "SELECT F_SeqNo FROM dbo.C_Product_Review_Data WHERE F_Review_ID = ? ORDER BY F_SeqNo",
+                        (review_id,)
+                    )
+                    data_ids = [row[0] for row in cursor.fetchall()]
                 
-                logger.info(f"評測記錄創建成功: {title}, 產品ID: {product_id}")
+                conn.commit()
+                logger.info(f"評測 {title} (ID: {review_id}) 及 {len(data_ids)} 筆數據寫入成功")
                 
                 return type('Review', (), {
-                    "F_SeqNo": new_id, 
+                    "F_SeqNo": review_id, 
                     "F_Type": review_type,
-                    "F_Title": title
+                    "F_Title": title,
+                    "data_ids": data_ids
                 })
             except Exception as e:
-                self.conn.rollback()
-                logger.error(f"評測記錄創建失敗: {str(e)}")
+                conn.rollback()
+                logger.error(f"評測及數據寫入失敗: {str(e)}")
+                import traceback
+                logger.error(traceback.format_exc())
                 raise
         
-        return await self.run_db_query(_create_review)
+        return await self.run_db_query(_store_review_with_data)
     
-    async def create_review_data(self, review_id, data_type, data_key, data_value, data_unit, product_name):
-        """創建評測數據記錄"""
-        def _create_review_data():
-            try:
-                self.cursor = self.conn.cursor()
-
-                sql = """
-                    INSERT INTO dbo.C_Product_Review_Data (
-                        F_Review_ID, F_Data_Type, F_Data_Key, F_Data_Value, F_Data_Unit, F_Product_Name
-                    ) OUTPUT INSERTED.F_SeqNo
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """
-                
-                self.cursor.execute(sql, (
-                    review_id, data_type, data_key, data_value, data_unit, product_name
-                ))
-                
-                new_id = self.cursor.fetchone()[0]
-                self.conn.commit()
-                
-                logger.debug(f"評測數據記錄創建成功: {data_key}={data_value}, 評測ID: {review_id}")
-                
-                return type('ReviewData', (), {
-                    "F_SeqNo": new_id, 
-                    "F_Review_ID": review_id,
-                    "F_Data_Type": data_type
-                })
-            except Exception as e:
-                self.conn.rollback()
-                logger.error(f"評測數據記錄創建失敗: {str(e)}")
-                raise
+    async def get_crawled_products(self):
+        """一次查詢載入已存儲產品的名稱、來源網址與內容指紋"""
+        def _get_crawled_products(conn, cursor):
+            cursor.execute("""
+                SELECT p.F_SeqNo, p.F_Product, u.F_Value, h.F_Value
+                FROM dbo.C_Product p
+                LEFT JOIN dbo.C_Specs_Database u
+                    ON u.F_Master_Table = 'C_Product'
+                    AND u.F_Master_ID = CAST(p.F_SeqNo AS NVARCHAR(20))
+                    AND u.F_Name = ?
+                LEFT JOIN dbo.C_Specs_Database h
+                    ON h.F_Master_Table = 'C_Product'
+                    AND h.F_Master_ID = CAST(p.F_SeqNo AS NVARCHAR(20))
+                    AND h.F_Name = ?
+            """, (SOURCE_URL_SPEC, FINGERPRINT_SPEC))
+            
+            products = [
+                {'id': row[0], 'name': row[1], 'url': row[2], 'fingerprint': row[3]}
+                for row in cursor.fetchall()
+            ]
+            logger.info(f"載入 {len(products)} 筆已存儲產品")
+            return products
         
-        return await self.run_db_query(_create_review_data)
+        return await self.run_db_query(_get_crawled_products)
+    
+    def _find_product(self, cursor, product_data, source_url):
+        """依自然鍵（產品名稱 + 廠商 + 來源網址）查找既有產品，並鎖定至事務結束"""
+        if source_url:
+            cursor.execute("""
+                SELECT TOP 1 p.F_SeqNo
+                FROM dbo.C_Product p WITH (UPDLOCK, HOLDLOCK)
+                JOIN dbo.C_Specs_Database u
+                    ON u.F_Master_Table = 'C_Product'
+                    AND u.F_Master_ID = CAST(p.F_SeqNo AS NVARCHAR(20))
+                    AND u.F_Name = ?
+                WHERE p.F_Product = ? AND p.F_Vendor = ? AND u.F_Value = ?
+                ORDER BY p.F_SeqNo
+            """, (SOURCE_URL_SPEC, product_data.get('F_Product'), product_data.get('F_Vendor'), source_url))
+        else:
+            cursor.execute("""
+                SELECT TOP 1 F_SeqNo
+                FROM dbo.C_Product WITH (UPDLOCK, HOLDLOCK)
+                WHERE F_Product = ? AND F_Vendor = ?
+                ORDER BY F_SeqNo
+            """, (product_data.get('F_Product'), product_data.get('F_Vendor')))
+        
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
+    def _update_product_if_changed(self, cursor, product_id, product_data, now):
+        """只有欄位值實際變更時才更新產品與 F_UpdateTime"""
+        if not product_data:
+            return False
+        
+        columns = list(product_data.keys())
+        cursor.execute(
+            f"SELECT {', '.join(columns)} FROM dbo.C_Product WHERE F_SeqNo = ?",
+            (product_id,)
+        )
+        current = cursor.fetchone()
+        changed = {
+            column: value for column, value in product_data.items()
+            if current is None or current[columns.index(column)] != value
+        }
+        if not changed:
+            return False
+        
+        update_data = {**changed, "F_UpdateTime": now}
+        assignments = ', '.join(f'{column} = ?' for column in update_data)
+        cursor.execute(
+            f"UPDATE dbo.C_Product SET {assignments} WHERE F_SeqNo = ?",
+            [*update_data.values(), product_id]
+        )
+        return True
+    
+    def _merge_specs(self, cursor, product_id, spec_rows, now):
+        """以暫存表批次 MERGE 規格：鍵值為 (產品 ID, 類別, 名稱)，值未變更的列不更新
+        
+        EXCEPT 以 NULL 相等的語意比較，任一邊為 NULL 而另一邊不是時也視為變更。
+        """
+        cursor.execute("DROP TABLE IF EXISTS #spec_stage")
+        cursor.execute("""
+            CREATE TABLE #spec_stage (
+                F_Type NVARCHAR(20) NOT NULL,
+                F_Name NVARCHAR(50) NOT NULL,
+                F_Value NVARCHAR(MAX) NULL
+            )
+        """)
+        if spec_rows:
+            cursor.fast_executemany = True
+            cursor.executemany(
+                "INSERT INTO #spec_stage (F_Type, F_Name, F_Value) VALUES (?, ?, ?)",
+                spec_rows
+            )
+        
+        # 目標限定為此產品的規格，來源中不存在的舊規格一併刪除
+        cursor.execute("""
+            WITH target AS (
+                SELECT * FROM dbo.C_Specs_Database
+                WHERE F_Master_Table = 'C_Product' AND F_Master_ID = ?
+            )
+            MERGE target AS t
+            USING #spec_stage AS s
+                ON t.F_Type = s.F_Type AND t.F_Name = s.F_Name
+            WHEN MATCHED AND EXISTS (SELECT t.F_Value EXCEPT SELECT s.F_Value) THEN
+                UPDATE SET F_Value = s.F_Value, F_UpdateTime = ?
+            WHEN NOT MATCHED BY TARGET THEN
+                INSERT (
+                    F_Createdate, F_UpdateTime, F_Stat, F_Keyin, F_Security, F_Owner,
+                    F_Master_Table, F_Master_ID, F_Type, F_Name, F_Value
+                )
+                VALUES (?, ?, '1', 'admin', 'S', 'admin', 'C_Product', ?, s.F_Type, s.F_Name, s.F_Value)
+            WHEN NOT MATCHED BY SOURCE THEN
+                DELETE;
+        """, (str(product_id), now, now, now, str(product_id)))
+        changed = cursor.rowcount
         
-    async def create_product_with_specs(self, product_data, specs_data):
+        cursor.execute("DROP TABLE #spec_stage")
+        return changed
+    
+    async def create_product_with_specs(self, product_data, specs_data, existing_id=None):
         
-        """在單一事務中創建產品及其規格"""
-        def _create_product_with_specs():
+        """在單一事務中以自然鍵 upsert 產品及其規格；已知產品 ID 時可直接指定 existing_id"""
+        def _create_product_with_specs(conn, cursor):
             try:
-                self.cursor = self.conn.cursor()
-                if self.cursor is None:
-                    raise Exception("Database cursor is not initialized. Check database connection.")
-                
-                # 開始事務
-                self.conn.autocommit = False
-                # 1. 創建產品
+                # 開始事務（連線池中的連線預設不自動提交）
                 now = datetime.now()
-                insert_data = {
-                    "F_Createdate": now,
-                    "F_UpdateTime": now,
-                    "F_Stat": "1",
-                    "F_Keyin": "admin",
-                    "F_Security": "S",
-                    "F_Owner": "admin",
-                    "F_BU": "GNP",
-                    **product_data
-                }
-                
-                columns = ', '.join(insert_data.keys())
-                placeholders = ', '.join(['?' for _ in insert_data])
+                source_url = next(
+                    (spec['value'] for spec in specs_data if spec['name'] == SOURCE_URL_SPEC), None
+                )
+                
+                # 1. 依自然鍵 upsert 產品主檔
+                product_id = existing_id or self._find_product(cursor, product_data, source_url)
+                if product_id:
+                    if self._update_product_if_changed(cursor, product_id, product_data, now):
+                        logger.info(f"產品 ID: {product_id} 內容已變更，更新主檔")
+                else:
+                    insert_data = {
+                        "F_Createdate": now,
+                        "F_UpdateTime": now,
+                        "F_Stat": "1",
+                        "F_Keyin": "admin",
+                        "F_Security": "S",
+                        "F_Owner": "admin",
+                        "F_BU": "GNP",
+                        **product_data
+                    }
+                    
+                    columns = ', '.join(insert_data.keys())
+                    placeholders = ', '.join(['?' for _ in insert_data])
 
-                sql = f"INSERT INTO dbo.C_Product ({columns}) OUTPUT INSERTED.F_SeqNo VALUES ({placeholders})"
+                    sql = f"INSERT INTO dbo.C_Product ({columns}) OUTPUT INSERTED.F_SeqNo VALUES ({placeholders})"
 
-                self.cursor.execute(sql, list(insert_data.values()))
-                product_id = self.cursor.fetchone()[0]
+                    cursor.execute(sql, list(insert_data.values()))
+                    product_id = cursor.fetchone()[0]
 
-                # 2. 處理所有規格類別
-                categories = {}
-                for spec in specs_data:
-                    category_name = spec['category']
-                    if category_name not in categories:
-                        # 檢查是否已存在
-                        self.cursor.execute(
-                            "SELECT F_SeqNo, F_ID FROM dbo.S_Flag WHERE F_Type = ? AND F_Name = ?",
-                            ('GPU 規格參數', category_name)
-                        )
-                        existing = self.cursor.fetchone()
-                        
-                        if existing:
-                            categories[category_name] = existing[1]
-                            logger.info(f"找到現有規格類別: {category_name} (ID: {existing[1]})")
-                        else:
-                            # 創建新類別
-                            self.cursor.execute(
-                                "SELECT MAX(CAST(F_ID AS INT)) FROM dbo.S_Flag WHERE F_Type = ?", 
-                                ('GPU 規格參數',)
-                            )
-                            max_id = self.cursor.fetchone()[0]
-                            
-                            next_id = "1"
-                            if max_id:
-                                next_id = str(int(max_id) + 1)
-                            
-                            self.cursor.execute("""
-                                INSERT INTO dbo.S_Flag (
-                                    F_Createdate, F_UpdateTime, F_Stat, F_Keyin, F_Security, 
-                                    F_Type, F_ID, F_Name
-                                ) OUTPUT INSERTED.F_ID
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                            """, (
-                                now, now, '1', 'admin', 'S',
-                                'GPU 規格參數', next_id, category_name
-                            ))
-                           
-                # 3. 創建所有規格
-                specs_count = 0
-                for spec in specs_data:
-                    self.cursor.execute(
-                        "SELECT F_ID FROM dbo.S_Flag WHERE F_Type = ? AND F_Name = ?",
-                        ('GPU 規格參數', spec['category'])
-                    )
+                # 2. 由類別快取解析所有規格類別，缺少的類別再批次建立
+                category_names = list(dict.fromkeys(spec['category'] for spec in specs_data))
+                categories, created_categories = self.categories.resolve(cursor, category_names, now)
 
-                    result = self.cursor.fetchone()
-                    category_id = result[0]
-                    print(f'category_id : {category_id}')
-                    self.cursor.execute("""
-                        INSERT INTO dbo.C_Specs_Database (
-                            F_Createdate, F_UpdateTime, F_Stat, F_Keyin, F_Security, F_Owner,
-                            F_Master_Table, F_Master_ID, F_Type, F_Name, F_Value
-                        ) OUTPUT INSERTED.F_SeqNo
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        now, now, '1', 'admin', 'S', 'admin',
-                        'C_Product', str(product_id), category_id, spec['name'], spec['value']
-                    ))
-                    
-                    self.cursor.fetchone()  # 取得 ID 但不需要使用
-                    specs_count += 1
+                # 3. 批次 MERGE 所有規格；同一 (類別, 名稱) 只保留第一筆，避免 MERGE 重複匹配
+                unique_specs = {}
+                for spec in specs_data:
+                    unique_specs.setdefault((categories[spec['category']], spec['name']), spec['value'])
+                spec_rows = [(category_id, name, value) for (category_id, name), value in unique_specs.items()]
+                changed_count = self._merge_specs(cursor, product_id, spec_rows, now)
                 
-                # 提交事務
-                self.conn.commit()
-                logger.info(f"成功創建產品 ID: {product_id} 及其 {specs_count} 條規格")
+                # 提交事務後才把新類別加入快取，回滾時不會留下不存在的 ID
+                conn.commit()
+                self.categories.register(created_categories)
+                logger.info(f"成功寫入產品 ID: {product_id} 及其 {len(spec_rows)} 條規格（變更 {changed_count} 條）")
                 
                 return product_id, categories
             except Exception as e:
-                self.conn.rollback()
+                conn.rollback()
                 logger.error(f"創建產品及規格失敗: {str(e)}")
                 import traceback
                 logger.error(traceback.format_exc())
                 raise
-            finally:
-                # 恢復自動提交
-                self.conn.autocommit = True
         
-        return await self.run_db_query(_create_product_with_specs)
\ No newline at end of file
+        return await self.run_db_query(_create_product_with_specs)
@@ -0,0 +1,63 @@
+import os
+import re
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class DebugCapture:
+    """解析除錯快照，預設關閉；啟用後由背景執行緒將每個 URL 的快照寫入指定目錄"""
+
+    def __init__(self, directory=None):
+        self.directory = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self.configure(directory)
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def configure(self, directory):
+        """設定輸出目錄；傳入 None 即關閉"""
+        self.directory = directory or None
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._writer, name='debug-capture', daemon=True)
+                self._thread.start()
+            logger.info(f"已啟用解析除錯快照，輸出目錄: {self.directory}")
+
+    @staticmethod
+    def _filename(url):
+        """將 URL 轉為安全的檔名"""
+        name = re.sub(r'[^\w.-]+', '_', (url or 'unknown').strip('/'))
+        return f'{name[-150:]}.txt'
+
+    def write(self, url, text):
+        """排入一份快照，實際寫檔在背景執行緒進行"""
+        if not self.enabled:
+            return
+        self._queue.put((os.path.join(self.directory, self._filename(url)), text))
+
+    def _writer(self):
+        while True:
+            path, text = self._queue.get()
+            try:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+            except OSError as e:
+                logger.warning(f"寫入除錯快照失敗 {path}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """等待所有排隊中的快照寫入完成"""
+        if self._thread is not None:
+            self._queue.join()
+
+
+# 全域除錯快照，透過 PARSER_DEBUG_DIR 環境變數啟用
+debug_capture = DebugCapture(os.getenv('PARSER_DEBUG_DIR'))
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# 各類頁面的快取有效時間（秒）
+DEFAULT_TTLS = {
+    'list': 24 * 3600,          # /gpu-specs/ 產品列表，每天更新
+    'gpu': 7 * 24 * 3600,       # GPU 詳情頁
+    'board': 7 * 24 * 3600,     # 主板詳情頁
+    'review': 30 * 24 * 3600,   # 評測頁面發布後幾乎不變
+    'other': 24 * 3600,
+}
+
+
+class ResponseCache:
+    """以 URL 為鍵的硬碟回應快取，支援 ETag / Last-Modified 條件式重新驗證"""
+
+    def __init__(self, cache_dir, ttls=None):
+        self.cache_dir = cache_dir
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def page_type(url):
+        """依 URL 判斷頁面類型，用於選擇 TTL"""
+        path = urlparse(url).path
+        if path.rstrip('/') == '/gpu-specs':
+            return 'list'
+        if path.startswith('/gpu-specs/'):
+            slug = path.rsplit('/', 1)[-1]
+            if '.b' in slug:
+                return 'board'
+            if '.c' in slug:
+                return 'gpu'
+        if path.startswith('/review/'):
+            return 'review'
+        return 'other'
+
+    def _path(self, url):
+        """URL 對應的快取檔案路徑"""
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f'{digest}.json')
+
+    def get(self, url):
+        """讀取快取項目，不存在或損壞時返回 None"""
+        path = self._path(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"讀取快取失敗 {url}: {str(e)}")
+            return None
+
+    def is_fresh(self, entry):
+        """判斷快取項目是否仍在 TTL 之內"""
+        ttl = self.ttls.get(entry.get('page_type'), self.ttls['other'])
+        return time.time() - entry.get('fetched_at', 0) < ttl
+
+    @staticmethod
+    def conditional_headers(entry):
+        """產生條件式請求頭"""
+        headers = {}
+        if not entry:
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """寫入快取項目（先寫暫存檔再替換，避免中途中斷留下半個檔案）"""
+        entry = {
+            'url': url,
+            'page_type': self.page_type(url),
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time(),
+        }
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"寫入快取失敗 {url}: {str(e)}")
+        return entry
+
+    def touch(self, entry):
+        """伺服器回應 304 時更新抓取時間"""
+        return self.store(entry['url'], entry['body'], entry.get('etag'), entry.get('last_modified'))
+
+    def get_stats(self):
+        """快取命中統計"""
+        return {
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+        }
@@ -1,13 +1,148 @@
+import os
 import re
+import hashlib
 import logging
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
+from utils.debug_capture import debug_capture
+# lxml 為選用依賴，未安裝時退回內建的 html.parser
+from utils.stream_parser import extract_list_page, HAS_LXML
+
 logger = logging.getLogger(__name__)
 
+# 可選用的 BeautifulSoup 樹建構器
+PARSER_BACKENDS = ('html.parser', 'lxml')
+
+# 評測表格的數值擷取
+TEMPERATURE_VALUE_RE = re.compile(r'(\d+(?:\.\d+)?)\s*([°C|dBA|RPM|W]+)')
+# 匹配如 "3244 MHz", "103.0 FPS", "360/400 W" 等格式
+OVERCLOCK_VALUE_RE = re.compile(r'(\d+(?:\.\d+)?(?:/\d+(?:\.\d+)?)?)\s*([A-Za-z]+)?')
+
+
+class ExtractionRule:
+    """從評測內文擷取單一欄位的規則：候選模式依優先順序排列，取第一個匹配的模式
+
+    所有候選模式另外合併成一個交替式，先以一次掃描找出最左側的匹配；
+    優先順序較高的模式在該位置之前都不可能匹配，只需從其後繼續搜尋。
+    """
+
+    def __init__(self, data_type, data_key, data_unit, label, patterns, value=None):
+        self.data_type = data_type
+        self.data_key = data_key
+        self.data_unit = data_unit
+        self.label = label
+        self.patterns = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+        self.combined = re.compile(
+            '|'.join(f'(?P<p{i}>{pattern})' for i, pattern in enumerate(patterns)), re.IGNORECASE
+        )
+        self.value = value or (lambda match: match.group(1))
+
+    def search(self, text):
+        """返回優先順序最高的候選模式的匹配結果"""
+        match = self.combined.search(text)
+        if match is None:
+            return None
+
+        index = int(match.lastgroup[1:])
+        for pattern in self.patterns[:index]:
+            earlier = pattern.search(text, match.start() + 1)
+            if earlier:
+                return earlier
+        return self.patterns[index].search(text, match.start())
+
+    def extract(self, text):
+        match = self.search(text)
+        return self.value(match) if match else None
+
+
+def _mos_value(match):
+    """MOS 型號，有電流規格時附加在後"""
+    if match.lastindex and match.lastindex > 1 and match.group(2):
+        return f"{match.group(1)} {match.group(2)}A"
+    return match.group(1)
+
+
+_WORD_TO_NUM = {
+    'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5',
+    'six': '6', 'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10'
+}
+
+# 電路板分析的擷取規則，新增欄位只需加入一筆規則
+PCB_EXTRACTION_RULES = [
+    ExtractionRule('GPU', 'MEM項數', 'phase', 'GPU 相數', [
+        r'A\s+(\d+\+\d+)\s+phase\s+VRM\s+powers\s+the\s+GPU',
+        r'(\d+\+\d+)[\s-]*phase\s+VRM.*powers\s+the\s+GPU',
+        r'GPU\s+is\s+powered\s+by\s+a\s+(\d+\+\d+)[\s-]*phase',
+        r'GPU.*?(\d+\+\d+)[\s-]*phase\s+VRM',
+        r'The\s+GPU\s+uses\s+a\s+(\d+\+\d+)[\s-]*phase',
+    ]),
+    ExtractionRule('GPU', '控制器型號', '', 'GPU 控制器型號', [
+        r'managed\s+by\s+a\s+Monolithic\s+Power\s+Systems\s+(MP\d+[A-Z]*)',
+        r'controller\s+is\s+(?:a\s+)?(?:Monolithic\s+Power\s+Systems\s+)?(MP\d+[A-Z]*)',
+        r'(MP\d+[A-Z]*)\s+controller',
+        r'controller\s+chip\s+is\s+(?:a\s+)?(?:Monolithic\s+Power\s+Systems\s+)?(MP\d+[A-Z]*)',
+    ]),
+    ExtractionRule('GPU', 'MOS規格', '', 'GPU MOS規格', [
+        r'GPU\s+power\s+phases\s+use\s+(\w+\s+\w+\s+\w+\s+DrMOS)(?:\s+with\s+a\s+rating\s+of\s+(\d+)\s+A)?',
+        r'(\w+\s+\w+\s+\w+\s+DrMOS)(?:\s+rated\s+for\s+(\d+)\s+A)?',
+        r'DrMOS\s+devices\s+are\s+(\w+\s+\w+\s+\w+)',
+    ], value=_mos_value),
+    ExtractionRule('Memory', 'MEM項數', 'phase', '記憶體相數', [
+        r'memory\s+chips\s+is\s+a\s+(\d+\+\d+)\s+phase\s+VRM',
+        r'memory\s+is\s+provided\s+by\s+a\s+(\d+\+\d+)\s+phase',
+        r'memory\s+power\s+is\s+a\s+(\d+\+\d+)\s+phase',
+        r'memory\s+voltage\s+uses\s+a\s+(\d+\+\d+)\s+phase',
+    ]),
+    ExtractionRule('Memory', '控制器型號', '', '記憶體控制器型號', [
+        r'driven\s+by\s+a\s+(?:second\s+)?Monolithic\s+Power\s+Systems\s+(MP\d+[A-Z]*)',
+        r'memory\s+controller\s+is\s+(?:a\s+)?(?:Monolithic\s+Power\s+Systems\s+)?(MP\d+[A-Z]*)',
+        r'memory\s+voltage\s+is\s+controlled\s+by\s+(?:a\s+)?(MP\d+[A-Z]*)',
+    ]),
+    ExtractionRule('Memory', '記憶體型號', 'Gbps', '記憶體晶片型號', [
+        r'memory\s+chips\s+are\s+made\s+by\s+(\w+),\s+and\s+bear\s+the\s+model\s+number\s+([\w\-]+),\s+they\s+are\s+rated\s+for\s+(\d+)\s+Gbps',
+        r'(\w+)\s+([\w\-]+)\s+memory\s+chips.*?rated\s+(?:at|for)\s+(\d+)\s+Gbps',
+        r'memory\s+chips\s+(?:are|from)\s+(\w+)\s+([\w\-]+).*?(\d+)\s+Gbps',
+    ], value=lambda match: f"{match.group(1)} {match.group(2)} {match.group(3)}"),
+    ExtractionRule('Memory', 'MOS規格', '', '記憶體MOS規格', [
+        r'memory\s+is\s+handled\s+by\s+(\w+\s+\w+\s+\w+\s+DrMOS)',
+        r'memory\s+VRM\s+uses\s+(\w+\s+\w+\s+\w+\s+DrMOS)',
+        r'memory\s+power\s+circuitry\s+uses\s+(\w+\s+\w+\s+\w+\s+DrMOS)',
+    ]),
+    ExtractionRule('Weight', 'weight', 'g', '產品重量', [
+        r'weighs\s+(\d+(?:\.\d+)?)\s*g',
+        r'weight\s+of\s+(\d+(?:\.\d+)?)\s*g',
+        r'weight:?\s+(\d+(?:\.\d+)?)\s*g',
+        r'comes\s+in\s+at\s+(\d+(?:\.\d+)?)\s*g',
+    ]),
+    ExtractionRule('Heatpipes', 'count', 'count', '熱管數量', [
+        r'(\w+)\s+heatpipes',
+        r'heatpipes:?\s+(\w+)',
+        r'(\d+)\s+heatpipes',
+    ], value=lambda match: _WORD_TO_NUM.get(match.group(1).lower(), match.group(1).lower())),
+]
+
 class GPUParser:
     """GPU 資料解析類"""
     
+    # 目前使用的解析後端，可透過 PARSER_BACKEND 環境變數或 set_backend 設定
+    backend = 'html.parser'
+    
+    @classmethod
+    def set_backend(cls, backend):
+        """設定解析後端，lxml 未安裝時退回 html.parser"""
+        backend = backend or 'html.parser'
+        if backend not in PARSER_BACKENDS:
+            raise ValueError(f"不支援的解析後端: {backend}，可選: {', '.join(PARSER_BACKENDS)}")
+        if backend == 'lxml' and not HAS_LXML:
+            logger.warning("未安裝 lxml，改用 html.parser")
+            backend = 'html.parser'
+        cls.backend = backend
+        logger.info(f"使用解析後端: {backend}")
+        return backend
+    
     @staticmethod
     def extract_vendor(product_name):
         """從產品名稱提取廠商"""
@@ -37,72 +172,130 @@ class GPUParser:
         
         return "Unknown"
     
+    @staticmethod
+    def parse_product_rows(html):
+        """解析產品列表頁面，返回精簡的 (產品名稱, 連結, 指紋) 列表"""
+        return GPUParser.parse_list_page(html)[0]
+    
     @staticmethod
     def parse_product_list(html):
         """解析產品列表頁面"""
-        soup = BeautifulSoup(html, 'html.parser')
-        gpu_list = []
-        
+        return [
+            {'name': name, 'url': url, 'fingerprint': fingerprint}
+            for name, url, fingerprint in GPUParser.parse_product_rows(html)
+        ]
+    
+    @staticmethod
+    def parse_list_page(html, facet_names=()):
+        """解析產品列表頁，返回 ((產品名稱, 連結, 指紋) 列表, {篩選參數: [可選值, ...]})
+
+        產品列與 facet_names 指定的篩選表單選項在同一次解析中取得。安裝 lxml 時只增量解析
+        篩選表單與 processors 表格並在表格結束後停止，否則退回完整 DOM 解析。
+        """
         try:
-            # 1. 精確查找 class="processors" 的表格
-            processors_table = soup.find('table', class_='processors')
-            if not processors_table:
-                logger.warning("找不到 class='processors' 的表格")
-                return gpu_list
-
-            # 2. 找到 thead 中的列標題
-            thead = processors_table.find('thead', class_='colheader')
-            if not thead:
-                logger.warning("找不到 class='colheader' 的表頭")
-                return gpu_list
-
-            # 3. 找到所有的 th，確定 Product Name 的位置
-            headers = thead.find_all('th')
-            product_name_index = -1
-            for i, th in enumerate(headers):
-                if th.get_text(strip=True) == 'Product Name':
-                    product_name_index = i
-                    break
-
-            if product_name_index == -1:
-                logger.warning("找不到 Product Name 列")
-                return gpu_list
-
-            # 4. 直接找表格中的所有行（不通過 tbody）
-            rows = processors_table.find_all('tr')
-            
-            # 跳過表頭行
-            for row in rows[1:]:  # 從第二行開始
-                cells = row.find_all('td')
-                if len(cells) > product_name_index:
-                    # 獲取產品名稱單元格
-                    product_cell = cells[product_name_index]
-                    
-                    # 獲取產品名稱和連結
-                    product_link = product_cell.find('a')
-                    if product_link:
-                        product_name = product_link.get_text(strip=True)
-                        product_url = product_link.get('href')
-                        
-                        if product_name and product_url:
-                            gpu_list.append({
-                                'name': product_name,
-                                'url': product_url
-                            })
-                            logger.info(f"找到 GPU: {product_name}")
-
-            logger.info(f"共找到 {len(gpu_list)} 個 GPU")
-            
+            if HAS_LXML:
+                products, facets = extract_list_page(html, facet_names)
+            else:
+                soup = GPUParser.make_soup(html)
+                products = GPUParser._extract_product_rows_soup(soup)
+                facets = GPUParser._extract_list_facets_soup(soup, facet_names)
         except Exception as e:
             logger.error(f"解析產品列表時出錯: {str(e)}")
             logger.exception(e)
+            return [], {}
+        
+        logger.info(f"共找到 {len(products)} 個 GPU")
+        return products, facets
+    
+    @staticmethod
+    def _extract_list_facets_soup(soup, names):
+        """以 DOM 擷取列表頁篩選表單的可選值（未安裝 lxml 時使用）"""
+        facets = {}
+        for name in names:
+            select = soup.find('select', attrs={'name': name})
+            if select:
+                values = [option.get('value') for option in select.find_all('option') if option.get('value')]
+                if values:
+                    facets[name] = values
+        return facets
+    
+    @staticmethod
+    def _extract_product_rows_soup(soup):
+        """以 DOM 擷取產品列表（未安裝 lxml 時使用）"""
+        products = []
+        
+        # 1. 精確查找 class="processors" 的表格
+        processors_table = soup.find('table', class_='processors')
+        if not processors_table:
+            logger.warning("找不到 class='processors' 的表格")
+            return products
+
+        # 2. 找到 thead 中的列標題
+        thead = processors_table.find('thead', class_='colheader')
+        if not thead:
+            logger.warning("找不到 class='colheader' 的表頭")
+            return products
+
+        # 3. 找到所有的 th，確定 Product Name 的位置
+        headers = thead.find_all('th')
+        product_name_index = -1
+        for i, th in enumerate(headers):
+            if th.get_text(strip=True) == 'Product Name':
+                product_name_index = i
+                break
+
+        if product_name_index == -1:
+            logger.warning("找不到 Product Name 列")
+            return products
+
+        # 4. 直接找表格中的所有行（不通過 tbody）
+        rows = processors_table.find_all('tr')
+        
+        # 跳過表頭行
+        for row in rows[1:]:  # 從第二行開始
+            cells = row.find_all('td')
+            if len(cells) > product_name_index:
+                # 獲取產品名稱單元格
+                product_cell = cells[product_name_index]
+                
+                # 獲取產品名稱和連結
+                product_link = product_cell.find('a')
+                if product_link:
+                    product_name = product_link.get_text(strip=True)
+                    product_url = product_link.get('href')
+                    
+                    if product_name and product_url:
+                        # 以整列內容計算指紋，用於增量模式判斷資料是否變更
+                        row_text = '|'.join(cell.get_text(strip=True) for cell in cells)
+                        products.append((
+                            product_name,
+                            product_url,
+                            hashlib.sha1(row_text.encode('utf-8')).hexdigest()
+                        ))
         
-        return gpu_list
+        return products
+    
+    @staticmethod
+    def make_soup(html, backend=None):
+        """建立 DOM 樹，同一份文件只需建立一次"""
+        return BeautifulSoup(html, backend or GPUParser.backend)
+    
+    @staticmethod
+    def parse_product_page(html, url):
+        """只建立一次 DOM，同時解析產品詳情、規格與主板區域"""
+        soup = GPUParser.make_soup(html)
+        product_data, specs_data = GPUParser.extract_product_detail(soup, url)
+        board_data = GPUParser.extract_boards_section(soup)
+        return product_data, specs_data, board_data
     
     @staticmethod
     def parse_product_detail(html, url):
         """解析產品詳情頁面"""
-        soup = BeautifulSoup(html, 'html.parser')
+        return GPUParser.extract_product_detail(GPUParser.make_soup(html), url)
+    
+    @staticmethod
+    def extract_product_detail(soup, url):
+        """從已建立的 DOM 解析產品詳情"""
         product_data = {}
         specs_data = []
         
@@ -169,89 +362,94 @@ class GPUParser:
             
             # 獲取規格區塊
             sections = soup.find_all(class_='sectioncontainer')
-            with open('sections_output.txt', 'w', encoding='utf-8') as f:
-            # 首先输出 sections 的总数
-                f.write(f'Total sections found: {len(sections)}\n\n')
-
-                # 然后遍历 sections，输出每个 section 的内容
-                for idx, container in enumerate(sections):
-                    sections_in_container = container.find_all('section')  # 查找当前 container 中的所有 section
-                    for section_idx,section in enumerate(sections_in_container):
-                        # 跳過相對性能區塊
-                        f.write(f'Section {idx + 1}, Section {section_idx + 1}:')
-                        f.write(section.prettify()) 
-                        f.write('\n')
-
-                        if section.find(class_='details jsonly gpudb-relative-performance'):
-                            f.write('遇到圖表')
-                            f.write('\n')
-                            continue
-                        
-                        # 嘗試獲取區塊標題
-                        header = section.find(['h2'])
-                        if header:
-                            f.write(f'Found header: {header.text}')
-                            f.write('\n')
-                        else:
-                            f.write(f'Not header')
-                            f.write('\n')
-                            continue
-                        
-                        category_name = header.get_text(strip=True)
+
+            # 除錯快照預設關閉，關閉時不做任何序列化
+            debug_lines = [] if debug_capture.enabled else None
+            if debug_lines is not None:
+                debug_lines.append(f'Total sections found: {len(sections)}\n')
+
+            # 然后遍历 sections，输出每个 section 的内容
+            for idx, container in enumerate(sections):
+                sections_in_container = container.find_all('section')  # 查找当前 container 中的所有 section
+                for section_idx,section in enumerate(sections_in_container):
+                    # 跳過相對性能區塊
+                    if debug_lines is not None:
+                        debug_lines.append(f'Section {idx + 1}, Section {section_idx + 1}:')
+                        debug_lines.append(section.prettify())
+
+                    if section.find(class_='details jsonly gpudb-relative-performance'):
+                        if debug_lines is not None:
+                            debug_lines.append('遇到圖表')
+                        continue
+                    
+                    # 嘗試獲取區塊標題
+                    header = section.find(['h2'])
+                    if header:
+                        if debug_lines is not None:
+                            debug_lines.append(f'Found header: {header.text}')
+                    else:
+                        if debug_lines is not None:
+                            debug_lines.append('Not header')
+                        continue
+                    
+                    category_name = header.get_text(strip=True)
+                    
+                    # 嘗試查找定義列表 (dl)
+                    definition_lists = section.find_all('dl')
+
+                    for dl in definition_lists:
                         
-                        # 嘗試查找定義列表 (dl)
-                        definition_lists = section.find_all('dl')
+                        # 獲取所有的定義術語和描述
+                        terms = dl.find_all('dt')
+                        descriptions = dl.find_all('dd')
+                        # 配對處理
+                        for i in range(min(len(terms), len(descriptions))):
+                            spec_name = terms[i].get_text(strip=True)
 
-                        for dl in definition_lists:
+                            # 處理描述中可能的鏈接
+                            spec_value = ""
+                            for content in descriptions[i].contents:
+                                if hasattr(content, 'name') and content.name == 'a':
+                                    spec_value += content.get_text(strip=True)
+                                elif isinstance(content, str):
+                                    spec_value += content.strip()
                             
-                            # 獲取所有的定義術語和描述
-                            terms = dl.find_all('dt')
-                            descriptions = dl.find_all('dd')
-                            # 配對處理
-                            for i in range(min(len(terms), len(descriptions))):
-                                spec_name = terms[i].get_text(strip=True)
-
-                                # 處理描述中可能的鏈接
-                                spec_value = ""
-                                for content in descriptions[i].contents:
-                                    if hasattr(content, 'name') and content.name == 'a':
-                                        spec_value += content.get_text(strip=True)
-                                    elif isinstance(content, str):
-                                        spec_value += content.strip()
-                                
-                                spec_value = spec_value.strip()
-                                
-                                if spec_name and spec_value:
-                                    specs_data.append({
-                                        'category': category_name,
-                                        'name': spec_name,
-                                        'value': spec_value
-                                    })
-                            # 處理表格數據 (如有)
-                            tables = section.find_all('table')
-                            for table in tables:
-                                headers = []
-                                thead = table.find('thead')
-                                if thead:
-                                    header_cells = thead.find_all('th')
-                                    headers = [cell.get_text(strip=True) for cell in header_cells]
-                                
-                                tbody = table.find('tbody')
-                                if tbody:
-                                    rows = tbody.find_all('tr')
-                                    for row in rows:
-                                        cells = row.find_all(['td', 'th'])
-                                        if len(cells) > 1:
-                                            spec_name = cells[0].get_text(strip=True)
-                                            spec_value = cells[1].get_text(strip=True)
-                                            if spec_name and spec_value:
-                                                specs_data.append({
-                                                    'category': category_name,
-                                                    'name': spec_name,
-                                                    'value': spec_value
-                                                })
-                    
-                    logger.info(f"解析 GPU {product_data.get('F_Product', 'Unknown')} 完成，找到 {len(specs_data)} 條規格")
+                            spec_value = spec_value.strip()
+                            
+                            if spec_name and spec_value:
+                                specs_data.append({
+                                    'category': category_name,
+                                    'name': spec_name,
+                                    'value': spec_value
+                                })
+                        # 處理表格數據 (如有)
+                        tables = section.find_all('table')
+                        for table in tables:
+                            headers = []
+                            thead = table.find('thead')
+                            if thead:
+                                header_cells = thead.find_all('th')
+                                headers = [cell.get_text(strip=True) for cell in header_cells]
+                            
+                            tbody = table.find('tbody')
+                            if tbody:
+                                rows = tbody.find_all('tr')
+                                for row in rows:
+                                    cells = row.find_all(['td', 'th'])
+                                    if len(cells) > 1:
+                                        spec_name = cells[0].get_text(strip=True)
+                                        spec_value = cells[1].get_text(strip=True)
+                                        if spec_name and spec_value:
+                                            specs_data.append({
+                                                'category': category_name,
+                                                'name': spec_name,
+                                                'value': spec_value
+                                            })
+                
+            if debug_lines is not None:
+                debug_capture.write(url, '\n'.join(debug_lines))
+
+            logger.info(f"解析 GPU {product_data.get('F_Product', 'Unknown')} 完成，找到 {len(specs_data)} 條規格")
         except Exception as e:
             logger.error(f"解析產品詳情時出錯: {str(e)}")
         
@@ -260,7 +458,7 @@ class GPUParser:
     @staticmethod
     def parse_board_details(html, url):
         """解析主板詳細資訊頁面獲取規格"""
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = GPUParser.make_soup(html)
         specs = {}
         
         try:
@@ -336,7 +534,11 @@ class GPUParser:
     @staticmethod
     def parse_boards_section(html):
         """解析主板區域"""
-        soup = BeautifulSoup(html, 'html.parser')
+        return GPUParser.extract_boards_section(GPUParser.make_soup(html))
+    
+    @staticmethod
+    def extract_boards_section(soup):
+        """從已建立的 DOM 解析主板區域"""
         board_data = []
         
         try:
@@ -398,7 +600,7 @@ class GPUParser:
     @staticmethod
     def parse_review_options(html):
         """解析評測頁面選項"""
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = GPUParser.make_soup(html)
         options = []
         
         try:
@@ -445,120 +647,133 @@ class GPUParser:
         return options
     
     @staticmethod
-    def parse_review_content(html, review_type):
-
-        """解析評測內容"""
-        soup = BeautifulSoup(html, 'html.parser')
+    def _is_header_or_image(tag):
+        """評測頁面中的 h2 標題或響應式圖片容器"""
+        return tag.name == 'h2' or (tag.name == 'div' and 'responsive-image-xx' in tag.get('class', []))
+    
+    @staticmethod
+    def review_needs_tables(review_type):
+        """只有溫度、噪音、超頻與功耗限制評測需要表格數據"""
+        return any(keyword in review_type for keyword in ("Temperature", "Fan noise", "Overclocking", "Power Limits"))
+    
+    @staticmethod
+    def extract_review_parts(soup, with_tables=True):
+        """從 DOM 擷取評測頁面需要的部分：章節、圖片與 active 表格列"""
+        parts = {'title': None, 'sections': None, 'images': [], 'tables': []}
+        
+        # 首先嘗試尋找 class="text p" 內的所有 h2 標籤
+        text_divs = soup.find_all('div', class_='text p')
+        if text_divs:
+            parts['sections'] = []
+            # 遍歷所有 text div
+            for div in text_divs:
+                # 獲取該 div 中的所有 h2 標籤
+                h2_tags = div.find_all('h2')
+                
+                # 使用第一個 h2 作為主標題（如果還沒有標題的話）
+                if h2_tags and parts['title'] is None:
+                    parts['title'] = h2_tags[0].get_text(strip=True)
+                
+                # 遍歷該 div 中的所有 h2 標籤
+                for i in range(len(h2_tags)):
+                    current_h2 = h2_tags[i]
+                    next_h2 = h2_tags[i + 1] if i + 1 < len(h2_tags) else None
+                    
+                    # 收集當前 h2 的內容
+                    section_content = []
+                    current = current_h2.next_sibling
+                    
+                    # 收集到下一個 h2 之前的所有內容
+                    while current and (not next_h2 or current != next_h2):
+                        if isinstance(current, str):
+                            text = current.strip()
+                            if text:
+                                section_content.append(text)
+                        elif current.name in ['p', 'span', 'div']:
+                            text = current.get_text(strip=True)
+                            if text:
+                                section_content.append(text)
+                        current = current.next_sibling
+                    
+                    parts['sections'].append({
+                        'title': current_h2.get_text(strip=True),
+                        'content': '\n'.join(section_content)
+                    })
+        
+        # 依文件順序走訪標題與圖片，每張圖片歸屬於其前面最近的 h2 標題
+        current_section = "General"
+        for element in soup.find_all(GPUParser._is_header_or_image):
+            if element.name == 'h2':
+                current_section = element.get_text(strip=True) or "General"
+                continue
+            
+            img_tag = element.find('img')
+            if img_tag and img_tag.get('src'):
+                parts['images'].append({
+                    'section': current_section,
+                    'url': img_tag.get('src'),
+                    'alt': img_tag.get('alt', '')
+                })
+        
+        if with_tables:
+            for table in soup.find_all('table'):
+                thead = table.find('thead')
+                tbody = table.find('tbody')
+                parts['tables'].append({
+                    'headers': [cell.get_text(strip=True) for cell in thead.find_all('th')] if thead else [],
+                    'rows': [
+                        [cell.get_text(strip=True) for cell in row.find_all(['td', 'th'])]
+                        for row in table.find_all('tr', class_='active')
+                    ],
+                    'body_rows': [
+                        [cell.get_text(strip=True) for cell in row.find_all(['td', 'th'])]
+                        for row in tbody.find_all('tr', class_='active')
+                    ] if tbody else []
+                })
+        
+        return parts
+    
+    @staticmethod
+    def build_review_content(parts, review_type):
+        """由擷取出的評測部分組合內容與結構化數據（DOM 與串流解析共用）"""
         content = {}
         review_data = []
         images_data = []  # 存儲圖片數據
         
         try:
-            # 首先嘗試尋找 class="text p" 內的所有 h2 標籤
-            text_divs = soup.find_all('div', class_='text p')
-            found_title = False
-            h2_contents = []  # 用於存儲所有 h2 及其內容
+            if parts['title'] is not None:
+                content['title'] = parts['title']
             
-            if text_divs:
-                # 遍歷所有 text div
-                for div in text_divs:
-                    # 獲取該 div 中的所有 h2 標籤
-                    h2_tags = div.find_all('h2')
-                    
-                    # 如果找到 h2 標籤
-                    if h2_tags:
-                        # 使用第一個 h2 作為主標題（如果還沒有標題的話）
-                        if not found_title:
-                            content['title'] = h2_tags[0].get_text(strip=True)
-                            found_title = True
-                        
-                        # 遍歷該 div 中的所有 h2 標籤
-                        for i in range(len(h2_tags)):
-                            current_h2 = h2_tags[i]
-                            next_h2 = h2_tags[i + 1] if i + 1 < len(h2_tags) else None
-                            
-                            # 收集當前 h2 的內容
-                            section_content = []
-                            current = current_h2.next_sibling
-                            
-                            # 收集到下一個 h2 之前的所有內容
-                            while current and (not next_h2 or current != next_h2):
-                                if isinstance(current, str):
-                                    text = current.strip()
-                                    if text:
-                                        section_content.append(text)
-                                elif current.name in ['p', 'span', 'div']:
-                                    text = current.get_text(strip=True)
-                                    if text:
-                                        section_content.append(text)
-                                current = current.next_sibling
-                            
-                            # 將該部分添加到結果中
-                            h2_contents.append({
-                                'title': current_h2.get_text(strip=True),
-                                'content': '\n'.join(section_content)
-                            })
-                
+            h2_contents = [dict(section) for section in parts['sections'] or []]
+            if parts['sections'] is not None:
                 # 將所有內容合併到 body 中
                 content['sections'] = h2_contents
                 content['body'] = '\n\n'.join(section['content'] for section in h2_contents)
             
-            # 提取圖片元素
-            responsive_images = soup.find_all('div', class_='responsive-image-xx')
-            current_section = "General"
-            
-            # 尋找所有標題，用於確定圖片所屬區域
-            headers = soup.find_all(['h2'])
-            header_positions = {}
-            
-            for header in headers:
-                header_text = header.get_text(strip=True)
-                header_positions[header] = {
-                    'text': header_text,
-                    'position': header.sourceline  # 獲取元素在源碼中的行號
+            images_by_section = {}
+            for image in parts['images']:
+                img_url = image['url']
+                image = {
+                    **image,
+                    'type': 'chart' if 'chart' in img_url.lower() or 'graph' in img_url.lower() else 'image'
                 }
-            
-            # 處理每個響應式圖片
-            for img_div in responsive_images:
-                # 查找該圖片前面最近的標題
-                img_position = img_div.sourceline
-                closest_header = None
-                closest_distance = float('inf')
                 
-                for header, data in header_positions.items():
-                    if data['position'] < img_position and img_position - data['position'] < closest_distance:
-                        closest_distance = img_position - data['position']
-                        closest_header = data['text']
+                # 添加到圖片數據列表
+                images_data.append(image)
+                images_by_section.setdefault(image['section'], []).append(image)
                 
-                section = closest_header if closest_header else current_section
-                
-                # 提取圖片 URL
-                img_tag = img_div.find('img')
-                if img_tag and img_tag.get('src'):
-                    img_url = img_tag.get('src')
-                    img_alt = img_tag.get('alt', '')
-                    
-                    # 添加到圖片數據列表
-                    images_data.append({
-                        'section': section,
-                        'url': img_url,
-                        'alt': img_alt,
-                        'type': 'chart' if 'chart' in img_url.lower() or 'graph' in img_url.lower() else 'image'
-                    })
-                    
-                    # 添加到結構化數據中
-                    review_data.append({
-                        'data_type': 'Image',
-                        'data_key': section,
-                        'data_value': img_url,
-                        'data_unit': 'URL',
-                        'product_name': content.get('title', '')
-                    })
+                # 添加到結構化數據中
+                review_data.append({
+                    'data_type': 'Image',
+                    'data_key': image['section'],
+                    'data_value': img_url,
+                    'data_unit': 'URL',
+                    'product_name': content.get('title', '')
+                })
             
             # 更新每個章節的圖片
             for section in h2_contents:
-                section_title = section['title']
-                section['images'] = [img for img in images_data if img['section'] == section_title]
+                section['images'] = list(images_by_section.get(section['title'], []))
             
             # 添加圖片資訊到返回內容
             content['images'] = images_data
@@ -566,22 +781,16 @@ class GPUParser:
             # 根據評測類型提取結構化數據
             if "Temperature" in review_type or "Fan noise" in review_type:
                 # 提取溫度表格
-                tables = soup.find_all('table')
-                for table in tables:
-                    rows = table.find_all('tr', class_='active')
-                    
-                    for row in rows:
-                        cells = row.find_all(['td', 'th'])
+                for table in parts['tables']:
+                    for cells in table['rows']:
                         if len(cells) >= 2:
-                            product_name = cells[0].get_text(strip=True)
+                            product_name = cells[0]
                             
                             # 根據表格結構提取數據
                             data_entries = []
-                            for i, cell in enumerate(cells[1:], 1):
-                                value_text = cell.get_text(strip=True)
-                                
+                            for i, value_text in enumerate(cells[1:], 1):
                                 # 嘗試提取數值和單位
-                                match = re.search(r'(\d+(?:\.\d+)?)\s*([°C|dBA|RPM|W]+)', value_text)
+                                match = TEMPERATURE_VALUE_RE.search(value_text)
                                 if match:
                                     value, unit = match.groups()
                                     data_entries.append({
@@ -595,36 +804,23 @@ class GPUParser:
                             
             # 超頻和功耗限制表格解析
             elif "Overclocking" in review_type or "Power Limits" in review_type:
-                # 找到所有表格
-                tables = soup.find_all('table')
-                for table in tables:
-                    # 獲取表頭
-                    headers = []
-                    thead = table.find('thead')
-                    if thead:
-                        header_cells = thead.find_all('th')
-                        headers = [cell.get_text(strip=True) for cell in header_cells]
+                for table in parts['tables']:
+                    headers = table['headers']
                     
-                    # 提取數據行
-                    rows = table.find('tbody').find_all('tr', class_='active') if table.find('tbody') else []
-                    
-                    for row in rows:
-                        cells = row.find_all(['td', 'th'])
+                    for cells in table['body_rows']:
                         if len(cells) >= 2:
-                            product_name = cells[0].get_text(strip=True)
+                            product_name = cells[0]
                             
                             # 提取每個單元格的數據
-                            for i, cell in enumerate(cells[1:], 1):
+                            for i, value_text in enumerate(cells[1:], 1):
                                 if i < len(headers):
                                     header_name = headers[i]
                                 else:
                                     header_name = f'col_{i}'
                                 
-                                value_text = cell.get_text(strip=True)
-                                
                                 # 嘗試提取數值和單位
                                 # 匹配如 "3244 MHz", "103.0 FPS", "360/400 W" 等格式
-                                match = re.search(r'(\d+(?:\.\d+)?(?:/\d+(?:\.\d+)?)?)\s*([A-Za-z]+)?', value_text)
+                                match = OVERCLOCK_VALUE_RE.search(value_text)
                                 if match:
                                     value = match.group(1)
                                     unit = match.group(2) if match.group(2) else ""
@@ -642,258 +838,55 @@ class GPUParser:
                 logger.info(f"開始分析電路板資料，內容長度: {len(content['body'])}")
                 logger.debug(f"內容前200字符: {content['body'][:200]}...")
                 
-                # 使用多種模式匹配 GPU VRM 相數
-                gpu_phase_patterns = [
-                    r'A\s+(\d+\+\d+)\s+phase\s+VRM\s+powers\s+the\s+GPU',
-                    r'(\d+\+\d+)[\s-]*phase\s+VRM.*powers\s+the\s+GPU',
-                    r'GPU\s+is\s+powered\s+by\s+a\s+(\d+\+\d+)[\s-]*phase',
-                    r'GPU.*?(\d+\+\d+)[\s-]*phase\s+VRM',
-                    r'The\s+GPU\s+uses\s+a\s+(\d+\+\d+)[\s-]*phase'
-                ]
-                
-                gpu_phase_found = False
-                for pattern in gpu_phase_patterns:
-                    gpu_phase_match = re.search(pattern, content['body'], re.IGNORECASE)
-                    if gpu_phase_match:
-                        gpu_phase_found = True
-                        review_data.append({
-                            'data_type': 'GPU',
-                            'data_key': 'MEM項數',
-                            'data_value': gpu_phase_match.group(1),
-                            'data_unit': 'phase',
-                            'product_name': content.get('title', '')
-                        })
-                        logger.info(f"成功匹配GPU相數: {gpu_phase_match.group(1)}")
-                        break
-                
-                if not gpu_phase_found:
-                    logger.warning(f"未找到 GPU VRM 相數資料，評測標題: {content.get('title', '')}")
-                
-                # 使用多種模式匹配 GPU 控制器型號
-                gpu_controller_patterns = [
-                    r'managed\s+by\s+a\s+Monolithic\s+Power\s+Systems\s+(MP\d+[A-Z]*)',
-                    r'controller\s+is\s+(?:a\s+)?(?:Monolithic\s+Power\s+Systems\s+)?(MP\d+[A-Z]*)',
-                    r'(MP\d+[A-Z]*)\s+controller',
-                    r'controller\s+chip\s+is\s+(?:a\s+)?(?:Monolithic\s+Power\s+Systems\s+)?(MP\d+[A-Z]*)'
-                ]
-                
-                controller_found = False
-                for pattern in gpu_controller_patterns:
-                    gpu_controller_match = re.search(pattern, content['body'], re.IGNORECASE)
-                    if gpu_controller_match:
-                        controller_found = True
-                        review_data.append({
-                            'data_type': 'GPU',
-                            'data_key': '控制器型號',
-                            'data_value': gpu_controller_match.group(1),
-                            'data_unit': '',
-                            'product_name': content.get('title', '')
-                        })
-                        logger.info(f"成功匹配GPU控制器: {gpu_controller_match.group(1)}")
-                        break
-                
-                if not controller_found:
-                    logger.warning(f"未找到 GPU 控制器型號資料，評測標題: {content.get('title', '')}")
-                
-                # 使用多種模式匹配 GPU MOS 規格
-                gpu_mos_patterns = [
-                    r'GPU\s+power\s+phases\s+use\s+(\w+\s+\w+\s+\w+\s+DrMOS)(?:\s+with\s+a\s+rating\s+of\s+(\d+)\s+A)?',
-                    r'(\w+\s+\w+\s+\w+\s+DrMOS)(?:\s+rated\s+for\s+(\d+)\s+A)?',
-                    r'DrMOS\s+devices\s+are\s+(\w+\s+\w+\s+\w+)'
-                ]
-                
-                mos_found = False
-                for pattern in gpu_mos_patterns:
-                    gpu_mos_match = re.search(pattern, content['body'], re.IGNORECASE)
-                    if gpu_mos_match:
-                        mos_found = True
-                        mos_spec = gpu_mos_match.group(1)
-                        if len(gpu_mos_match.groups()) > 1 and gpu_mos_match.group(2):  # 如果有電流規格
-                            mos_spec = gpu_mos_match.group(1)
-                            if len(gpu_mos_match.groups()) > 1 and gpu_mos_match.group(2):  # 如果有電流規格
-                                mos_spec += f" {gpu_mos_match.group(2)}A"
-                            
-                            review_data.append({
-                                'data_type': 'GPU',
-                                'data_key': 'MOS規格',
-                                'data_value': mos_spec,
-                                'data_unit': '',
-                                'product_name': content.get('title', '')
-                            })
-                            logger.info(f"成功匹配GPU MOS規格: {mos_spec}")
-                            break
-                    
-                    if not mos_found:
-                        logger.warning(f"未找到 GPU MOS規格資料，評測標題: {content.get('title', '')}")
-                    
-                    # 使用多種模式匹配 Memory VRM 相數
-                    mem_phase_patterns = [
-                        r'memory\s+chips\s+is\s+a\s+(\d+\+\d+)\s+phase\s+VRM',
-                        r'memory\s+is\s+provided\s+by\s+a\s+(\d+\+\d+)\s+phase',
-                        r'memory\s+power\s+is\s+a\s+(\d+\+\d+)\s+phase',
-                        r'memory\s+voltage\s+uses\s+a\s+(\d+\+\d+)\s+phase'
-                    ]
-                    
-                    mem_phase_found = False
-                    for pattern in mem_phase_patterns:
-                        mem_phase_match = re.search(pattern, content['body'], re.IGNORECASE)
-                        if mem_phase_match:
-                            mem_phase_found = True
-                            review_data.append({
-                                'data_type': 'Memory',
-                                'data_key': 'MEM項數',
-                                'data_value': mem_phase_match.group(1),
-                                'data_unit': 'phase',
-                                'product_name': content.get('title', '')
-                            })
-                            logger.info(f"成功匹配記憶體相數: {mem_phase_match.group(1)}")
-                            break
-                    
-                    if not mem_phase_found:
-                        logger.warning(f"未找到記憶體相數資料，評測標題: {content.get('title', '')}")
-                    
-                    # 使用多種模式匹配 Memory 控制器型號
-                    mem_controller_patterns = [
-                        r'driven\s+by\s+a\s+(?:second\s+)?Monolithic\s+Power\s+Systems\s+(MP\d+[A-Z]*)',
-                        r'memory\s+controller\s+is\s+(?:a\s+)?(?:Monolithic\s+Power\s+Systems\s+)?(MP\d+[A-Z]*)',
-                        r'memory\s+voltage\s+is\s+controlled\s+by\s+(?:a\s+)?(MP\d+[A-Z]*)'
-                    ]
-                    
-                    mem_controller_found = False
-                    for pattern in mem_controller_patterns:
-                        mem_controller_match = re.search(pattern, content['body'], re.IGNORECASE)
-                        if mem_controller_match:
-                            mem_controller_found = True
-                            review_data.append({
-                                'data_type': 'Memory',
-                                'data_key': '控制器型號',
-                                'data_value': mem_controller_match.group(1),
-                                'data_unit': '',
-                                'product_name': content.get('title', '')
-                            })
-                            logger.info(f"成功匹配記憶體控制器: {mem_controller_match.group(1)}")
-                            break
-                    
-                    if not mem_controller_found:
-                        logger.warning(f"未找到記憶體控制器型號資料，評測標題: {content.get('title', '')}")
-                    
-                    # 使用多種模式匹配 Memory 芯片型號和速率
-                    mem_chip_patterns = [
-                        r'memory\s+chips\s+are\s+made\s+by\s+(\w+),\s+and\s+bear\s+the\s+model\s+number\s+([\w\-]+),\s+they\s+are\s+rated\s+for\s+(\d+)\s+Gbps',
-                        r'(\w+)\s+([\w\-]+)\s+memory\s+chips.*?rated\s+(?:at|for)\s+(\d+)\s+Gbps',
-                        r'memory\s+chips\s+(?:are|from)\s+(\w+)\s+([\w\-]+).*?(\d+)\s+Gbps'
-                    ]
-                    
-                    mem_chip_found = False
-                    for pattern in mem_chip_patterns:
-                        mem_chip_match = re.search(pattern, content['body'], re.IGNORECASE)
-                        if mem_chip_match:
-                            mem_chip_found = True
-                            manufacturer = mem_chip_match.group(1)
-                            model = mem_chip_match.group(2)
-                            speed = mem_chip_match.group(3)
-                            
-                            review_data.append({
-                                'data_type': 'Memory',
-                                'data_key': '記憶體型號',
-                                'data_value': f"{manufacturer} {model} {speed}",
-                                'data_unit': 'Gbps',
-                                'product_name': content.get('title', '')
-                            })
-                            logger.info(f"成功匹配記憶體晶片型號: {manufacturer} {model} {speed}Gbps")
-                            break
-                    
-                    if not mem_chip_found:
-                        logger.warning(f"未找到記憶體晶片型號資料，評測標題: {content.get('title', '')}")
-                    
-                    # 使用多種模式匹配 Memory MOS規格
-                    mem_mos_patterns = [
-                        r'memory\s+is\s+handled\s+by\s+(\w+\s+\w+\s+\w+\s+DrMOS)',
-                        r'memory\s+VRM\s+uses\s+(\w+\s+\w+\s+\w+\s+DrMOS)',
-                        r'memory\s+power\s+circuitry\s+uses\s+(\w+\s+\w+\s+\w+\s+DrMOS)'
-                    ]
-                    
-                    mem_mos_found = False
-                    for pattern in mem_mos_patterns:
-                        mem_mos_match = re.search(pattern, content['body'], re.IGNORECASE)
-                        if mem_mos_match:
-                            mem_mos_found = True
-                            review_data.append({
-                                'data_type': 'Memory',
-                                'data_key': 'MOS規格',
-                                'data_value': mem_mos_match.group(1),
-                                'data_unit': '',
-                                'product_name': content.get('title', '')
-                            })
-                            logger.info(f"成功匹配記憶體MOS規格: {mem_mos_match.group(1)}")
-                            break
-                    
-                    if not mem_mos_found:
-                        logger.warning(f"未找到記憶體MOS規格資料，評測標題: {content.get('title', '')}")
-                
-                # 從文本中提取其他通用數據
-                # 提取重量
-                weight_patterns = [
-                    r'weighs\s+(\d+(?:\.\d+)?)\s*g',
-                    r'weight\s+of\s+(\d+(?:\.\d+)?)\s*g',
-                    r'weight:?\s+(\d+(?:\.\d+)?)\s*g',
-                    r'comes\s+in\s+at\s+(\d+(?:\.\d+)?)\s*g'
-                ]
-                
-                weight_found = False
-                for pattern in weight_patterns:
-                    weight_match = re.search(pattern, content['body'], re.IGNORECASE)
-                    if weight_match:
-                        weight_found = True
-                        review_data.append({
-                            'data_type': 'Weight',
-                            'data_key': 'weight',
-                            'data_value': weight_match.group(1),
-                            'data_unit': 'g',
-                            'product_name': content.get('title', '')
-                        })
-                        logger.info(f"成功匹配產品重量: {weight_match.group(1)}g")
-                        break
-                
-                if not weight_found:
-                    logger.warning(f"未找到產品重量資料，評測標題: {content.get('title', '')}")
-                
-                # 提取熱管數量
-                heatpipe_patterns = [
-                    r'(\w+)\s+heatpipes',
-                    r'heatpipes:?\s+(\w+)',
-                    r'(\d+)\s+heatpipes'
-                ]
-                
-                heatpipe_found = False
-                for pattern in heatpipe_patterns:
-                    heatpipe_match = re.search(pattern, content['body'], re.IGNORECASE)
-                    if heatpipe_match:
-                        heatpipe_found = True
-                        # 將文字數字轉換為數字
-                        word_to_num = {
-                            'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5',
-                            'six': '6', 'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10'
-                        }
-                        
-                        heatpipe_count = heatpipe_match.group(1).lower()
-                        if heatpipe_count in word_to_num:
-                            heatpipe_count = word_to_num[heatpipe_count]
-                        
-                        review_data.append({
-                            'data_type': 'Heatpipes',
-                            'data_key': 'count',
-                            'data_value': heatpipe_count,
-                            'data_unit': 'count',
-                            'product_name': content.get('title', '')
-                        })
-                        logger.info(f"成功匹配熱管數量: {heatpipe_count}")
-                        break
-                
-                if not heatpipe_found:
-                    logger.warning(f"未找到熱管數量資料，評測標題: {content.get('title', '')}")
+                title = content.get('title', '')
+                for rule in PCB_EXTRACTION_RULES:
+                    value = rule.extract(content['body'])
+                    if value is None:
+                        logger.warning(f"未找到 {rule.label}資料，評測標題: {title}")
+                        continue
+                    review_data.append({
+                        'data_type': rule.data_type,
+                        'data_key': rule.data_key,
+                        'data_value': value,
+                        'data_unit': rule.data_unit,
+                        'product_name': title
+                    })
+                    logger.info(f"成功匹配{rule.label}: {value}")
         except Exception as e:
             logger.error(f"解析評測內容時出錯: {str(e)}")
         
         return content, review_data
-    
\ No newline at end of file
+    
+    @staticmethod
+    def parse_review_content(html, review_type):
+        """解析評測內容"""
+        try:
+            soup = GPUParser.make_soup(html)
+            parts = GPUParser.extract_review_parts(soup, with_tables=GPUParser.review_needs_tables(review_type))
+        except Exception as e:
+            logger.error(f"解析評測內容時出錯: {str(e)}")
+            return {}, []
+        return GPUParser.build_review_content(parts, review_type)
+
+
+def _init_parse_worker(backend, debug_dir):
+    """解析子行程初始化：沿用主行程的解析後端與除錯設定"""
+    GPUParser.backend = backend
+    debug_capture.configure(debug_dir)
+    if debug_capture.enabled:
+        # 子行程結束時不執行 atexit，且寫入執行緒為 daemon，須在行程終結器中等待快照寫完
+        multiprocessing.util.Finalize(None, debug_capture.flush, exitpriority=10)
+
+
+def create_parse_executor(max_workers):
+    """建立解析用的行程池，輸入原始 HTML，輸出純 dict/list 結果"""
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_parse_worker,
+        initargs=(GPUParser.backend, debug_capture.directory)
+    )
+
+
+# 由環境變數設定預設解析後端
+if os.getenv('PARSER_BACKEND'):
+    GPUParser.set_backend(os.getenv('PARSER_BACKEND'))
@@ -0,0 +1,86 @@
+import os
+import gzip
+import json
+import time
+import random
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseRecorder:
+    """將爬取到的每個回應（URL、狀態、標頭、內容）寫入 gzip 壓縮的 JSON Lines 封存檔"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 以附加模式開啟，多次錄製會寫成多個 gzip 成員，讀取時可連續解壓
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self._recorded = set()
+        logger.info(f"錄製回應至: {path}")
+
+    def record(self, url, body, status=200, headers=None):
+        """記錄一個回應；同一 URL 只記錄一次"""
+        if url in self._recorded:
+            return
+        self._recorded.add(url)
+        self._file.write(json.dumps({
+            'url': url,
+            'status': status,
+            'headers': dict(headers or {}),
+            'body': body,
+            'recorded_at': time.time(),
+        }, ensure_ascii=False))
+        self._file.write('\n')
+
+    def close(self):
+        self._file.close()
+        logger.info(f"錄製完成，共 {len(self._recorded)} 個回應")
+
+
+class ReplayTransport:
+    """從錄製的封存檔提供回應，可模擬網路延遲，用於離線執行完整爬蟲流程"""
+
+    def __init__(self, path, latency=0.0, jitter=0.0):
+        self.path = path
+        self.latency = latency  # 每個請求的固定延遲（秒）
+        self.jitter = jitter    # 隨機附加延遲上限（秒）
+        self.responses = {}
+        self.served = 0
+        self.missing = 0
+        self.revalidated = 0  # 錄製時為 304 重新驗證的回應
+
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.responses[record['url']] = record
+        logger.info(f"載入 {len(self.responses)} 個錄製回應: {path}")
+
+    async def fetch(self, url):
+        """返回錄製的回應內容，不存在時返回 None"""
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        record = self.responses.get(url)
+        if record is None:
+            self.missing += 1
+            logger.warning(f"回放資料中沒有: {url}")
+            return None
+
+        self.served += 1
+        if record.get('status') == 304:
+            self.revalidated += 1
+        return record['body']
+
+    def get_stats(self):
+        return {
+            'recorded': len(self.responses),
+            'served': self.served,
+            'missing': self.missing,
+            'revalidated': self.revalidated,
+        }
@@ -69,42 +69,30 @@ class StorageManager:
     def __init__(self, db, state):
         self.db = db
         self.state = state
-        self.category_cache = {}  # 快取已處理的類別
+        self.category_cache = db.categories  # 與資料庫共用的規格類別快取
     
-    async def store_product_complete(self, product_data, specs_data, board_data=None):
+    async def store_product_complete(self, product_data, specs_data, board_data=None, existing_id=None):
         """完整處理一個產品的所有資料存儲，確保事務一致性"""
         try:
-            # 嘗試使用單一事務處理
-            try:
-                product_id, categories = await self.db.create_product_with_specs(product_data, specs_data)
-                
-                # 更新類別快取
-                self.category_cache.update(categories)
-                
-                # 更新狀態
-                self.state.add_product(product_id, product_data.get('F_Product', '未知產品'))
-                self.state.specs_count += len(specs_data)
-                
-                logger.info(f"成功在單一事務中創建產品及規格: {product_data.get('F_Product', '未知產品')} (ID: {product_id})")
-                return product_id
-                
-            except Exception as e:
-                logger.error(f"單一事務處理失敗，嘗試分步處理: {str(e)}")
-                
-                # 退回到分步處理
-                # 1. 存儲產品主數據
-                product = await self.db.create_product(product_data)
-                product_id = product.F_SeqNo
-                
-                # 更新狀態
-                self.state.add_product(product_id, product_data.get('F_Product', '未知產品'))
-                
-                # 2. 處理並存儲所有規格類別和規格數據
-                if specs_data:
-                    await self._store_all_specs(product_id, specs_data)
-                
-                logger.info(f"成功通過分步處理創建產品及規格: {product_data.get('F_Product', '未知產品')} (ID: {product_id})")
-                return product_id
+            # 單一事務失敗（例如死結）時整筆回滾，以相同的 upsert 重試一次；
+            # 不退回逐筆插入，否則會忽略自然鍵與 existing_id 而產生重複產品
+            for attempt in range(2):
+                try:
+                    product_id, _ = await self.db.create_product_with_specs(
+                        product_data, specs_data, existing_id=existing_id
+                    )
+                    break
+                except Exception as e:
+                    if attempt:
+                        raise
+                    logger.error(f"單一事務處理失敗，重試一次: {str(e)}")
+            
+            # 更新狀態
+            self.state.add_product(product_id, product_data.get('F_Product', '未知產品'))
+            self.state.specs_count += len(specs_data)
+            
+            logger.info(f"成功在單一事務中創建產品及規格: {product_data.get('F_Product', '未知產品')} (ID: {product_id})")
+            return product_id
         except Exception as e:
             logger.error(f"存儲產品完整資料失敗: {str(e)}")
             import traceback
@@ -112,37 +100,6 @@ class StorageManager:
             self.state.error_count += 1
             raise
     
-    async def _store_all_specs(self, product_id, specs_data):
-        """存儲所有規格資料，確保類別先建立"""
-        # 先處理所有類別
-        for spec in specs_data:
-            category_name = spec['category']
-            if category_name not in self.category_cache:
-                try:
-                    category = await self.db.create_spec_category(category_name)
-                    self.category_cache[category_name] = category.F_ID
-                    logger.info(f"建立規格類別: {category_name} (ID: {category.F_ID})")
-                except Exception as e:
-                    logger.error(f"建立規格類別 {category_name} 失敗: {str(e)}")
-                    continue
-        
-        # 再存儲所有規格
-        for spec in specs_data:
-            try:
-                category_name = spec['category']
-                if category_name in self.category_cache:
-                    await self.db.create_spec(
-                        product_id,
-                        self.category_cache[category_name],
-                        spec['name'],
-                        spec['value']
-                    )
-                    self.state.add_spec(product_id)
-                    logger.debug(f"為產品 {product_id} 添加規格: {spec['name']}={spec['value']}")
-            except Exception as e:
-                logger.error(f"存儲規格資料失敗: {str(e)}")
-                continue
-    
     async def store_board(self, product_id, board_info):
         """存儲主板資料，使用替代方法建立與GPU的關聯"""
         try:
@@ -215,24 +172,25 @@ class StorageManager:
         """存儲評測資料，關聯到主板而非GPU"""
         try:
             for content in review_contents:
-                # 使用board_id而非product_id
-                review = await self.db.create_review(
-                    board_id,  # 使用主板ID
-                    content['type'],
-                    content['content'].get('title', ''),
-                    content['content'].get('body', '')
-                )
-                
-                # 儲存結構化數據
-                for data_item in content['data']:
-                    await self.db.create_review_data(
-                        review.F_SeqNo,
+                # 評測與所有結構化數據在同一事務中批次寫入
+                data_rows = [
+                    (
                         data_item.get('data_type', content['type']),
                         data_item.get('data_key', ''),
                         data_item.get('data_value', ''),
                         data_item.get('data_unit', ''),
                         data_item.get('product_name', board_name)
                     )
+                    for data_item in content['data']
+                ]
+                # 使用board_id而非product_id
+                await self.db.store_review_with_data(
+                    board_id,  # 使用主板ID
+                    content['type'],
+                    content['content'].get('title', ''),
+                    content['content'].get('body', ''),
+                    data_rows
+                )
                 
                 # 更新狀態
                 self.state.add_review(product_id, board_name)  # 仍然記錄與GPU的關聯
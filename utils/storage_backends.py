@@ -0,0 +1,536 @@
+import os
+import abc
+import asyncio
+import hashlib
+import sqlite3
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 爬蟲中繼資料以規格記錄的形式存放，避免修改 C_Product 結構
+CRAWL_META_CATEGORY = '爬蟲資訊'
+SOURCE_URL_SPEC = '來源網址'
+FINGERPRINT_SPEC = '內容指紋'
+
+# 可選用的存儲後端
+STORAGE_BACKENDS = ('sqlserver', 'sqlite', 'parquet')
+
+
+class StorageBackend(abc.ABC):
+    """StorageManager 使用的存儲介面，各後端實作相同的非同步方法"""
+
+    # 規格類別名稱 -> F_ID，需支援 `in` 與 get()
+    categories = None
+
+    @abc.abstractmethod
+    async def get_crawled_products(self):
+        """返回已存儲產品的 id、name、url、fingerprint"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def create_product_with_specs(self, product_data, specs_data, existing_id=None):
+        """以自然鍵 upsert 產品及其規格，返回 (產品 ID, 類別名稱 -> F_ID)"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def store_review_with_data(self, product_id, review_type, title, desc, data_rows):
+        """在單一事務中寫入評測及其所有結構化數據"""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def create_product(self, product_data):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def create_spec_category(self, category_name):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def create_spec(self, product_id, category_id, spec_name, spec_value):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def disconnect(self):
+        raise NotImplementedError
+
+
+def _source_url(specs_data):
+    return next((spec['value'] for spec in specs_data if spec['name'] == SOURCE_URL_SPEC), None)
+
+
+def _unique_spec_rows(specs_data, categories):
+    """同一 (類別, 名稱) 只保留第一筆"""
+    unique_specs = {}
+    for spec in specs_data:
+        unique_specs.setdefault((categories[spec['category']], spec['name']), spec['value'])
+    return [(category_id, name, value) for (category_id, name), value in unique_specs.items()]
+
+
+class SQLiteStorage(StorageBackend):
+    """本機 SQLite 存儲（WAL 模式），表結構與 SQL Server 相同，適合爬蟲節點先落地再匯入"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS C_Product (
+            F_SeqNo INTEGER PRIMARY KEY AUTOINCREMENT,
+            F_Createdate TEXT NOT NULL, F_UpdateTime TEXT NOT NULL, F_Stat TEXT NOT NULL,
+            F_Keyin TEXT, F_Security TEXT, F_Owner TEXT,
+            F_Product TEXT, F_Vendor TEXT, F_GPU_Image_URL TEXT, F_BU TEXT, F_Desc TEXT
+        );
+        CREATE INDEX IF NOT EXISTS IX_C_Product_Name ON C_Product (F_Product, F_Vendor);
+        CREATE TABLE IF NOT EXISTS C_Specs_Database (
+            F_SeqNo INTEGER PRIMARY KEY AUTOINCREMENT,
+            F_Createdate TEXT NOT NULL, F_UpdateTime TEXT NOT NULL, F_Stat TEXT NOT NULL,
+            F_Keyin TEXT, F_Security TEXT, F_Owner TEXT,
+            F_Master_Table TEXT, F_Master_ID TEXT, F_Type TEXT, F_Name TEXT, F_Value TEXT
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS UX_C_Specs_Database_Key
+            ON C_Specs_Database (F_Master_Table, F_Master_ID, F_Type, F_Name);
+        CREATE INDEX IF NOT EXISTS IX_C_Specs_Database_Name ON C_Specs_Database (F_Name, F_Value);
+        CREATE TABLE IF NOT EXISTS C_Product_Review (
+            F_SeqNo INTEGER PRIMARY KEY AUTOINCREMENT,
+            F_Createdate TEXT NOT NULL, F_UpdateTime TEXT NOT NULL, F_Stat TEXT NOT NULL,
+            F_Keyin TEXT, F_Security TEXT, F_Owner TEXT,
+            F_Master_Table TEXT, F_Master_ID TEXT, F_Type TEXT, F_Title TEXT, F_Desc TEXT
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS UX_C_Product_Review_Key
+            ON C_Product_Review (F_Master_Table, F_Master_ID, F_Type);
+        CREATE TABLE IF NOT EXISTS C_Product_Review_Data (
+            F_SeqNo INTEGER PRIMARY KEY AUTOINCREMENT,
+            F_Review_ID INTEGER NOT NULL,
+            F_Data_Type TEXT, F_Data_Key TEXT, F_Data_Value TEXT, F_Data_Unit TEXT, F_Product_Name TEXT
+        );
+        CREATE INDEX IF NOT EXISTS IX_C_Product_Review_Data_Review ON C_Product_Review_Data (F_Review_ID);
+        CREATE TABLE IF NOT EXISTS S_Flag (
+            F_SeqNo INTEGER PRIMARY KEY AUTOINCREMENT,
+            F_Createdate TEXT NOT NULL, F_UpdateTime TEXT NOT NULL, F_Stat TEXT NOT NULL,
+            F_Keyin TEXT, F_Security TEXT,
+            F_Type TEXT, F_ID TEXT, F_Name TEXT
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS UX_S_Flag_Name ON S_Flag (F_Type, F_Name);
+    """
+
+    FLAG_TYPE = 'GPU 規格參數'
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # SQLite 只允許單一寫入者，所有操作在同一條專用執行緒中依序執行
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(self.SCHEMA)
+        self.conn.commit()
+
+        self.categories = {
+            name: flag_id for name, flag_id in self.conn.execute(
+                "SELECT F_Name, F_ID FROM S_Flag WHERE F_Type = ?", (self.FLAG_TYPE,)
+            )
+        }
+        logger.info(f"SQLite 存儲已開啟: {path}（{len(self.categories)} 個規格類別）")
+
+    async def run_db_query(self, query_func, *args):
+        """在專用執行緒中執行同步查詢，失敗時回滾"""
+        def _run():
+            try:
+                return query_func(self.conn, *args)
+            except Exception:
+                self.conn.rollback()
+                raise
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _run)
+
+    @staticmethod
+    def _now():
+        return datetime.now().isoformat(sep=' ', timespec='seconds')
+
+    def _resolve_categories(self, conn, category_names, now):
+        """解析類別 ID，缺少的在同一事務中建立；返回 (名稱 -> F_ID, 新建項目)"""
+        created = {}
+        missing = [name for name in category_names if name not in self.categories]
+        if missing:
+            max_id = conn.execute(
+                "SELECT MAX(CAST(F_ID AS INTEGER)) FROM S_Flag WHERE F_Type = ?", (self.FLAG_TYPE,)
+            ).fetchone()[0] or 0
+            for offset, name in enumerate(missing, 1):
+                created[name] = str(max_id + offset)
+            conn.executemany("""
+                INSERT INTO S_Flag (F_Createdate, F_UpdateTime, F_Stat, F_Keyin, F_Security, F_Type, F_ID, F_Name)
+                VALUES (?, ?, '1', 'admin', 'S', ?, ?, ?)
+            """, [(now, now, self.FLAG_TYPE, flag_id, name) for name, flag_id in created.items()])
+
+        categories = {name: self.categories.get(name) or created[name] for name in category_names}
+        return categories, created
+
+    async def get_crawled_products(self):
+        def _get_crawled_products(conn):
+            rows = conn.execute("""
+                SELECT p.F_SeqNo, p.F_Product, u.F_Value, h.F_Value
+                FROM C_Product p
+                LEFT JOIN C_Specs_Database u
+                    ON u.F_Master_Table = 'C_Product' AND u.F_Master_ID = CAST(p.F_SeqNo AS TEXT) AND u.F_Name = ?
+                LEFT JOIN C_Specs_Database h
+                    ON h.F_Master_Table = 'C_Product' AND h.F_Master_ID = CAST(p.F_SeqNo AS TEXT) AND h.F_Name = ?
+            """, (SOURCE_URL_SPEC, FINGERPRINT_SPEC)).fetchall()
+            return [{'id': r[0], 'name': r[1], 'url': r[2], 'fingerprint': r[3]} for r in rows]
+
+        return await self.run_db_query(_get_crawled_products)
+
+    async def create_product_with_specs(self, product_data, specs_data, existing_id=None):
+        def _create_product_with_specs(conn):
+            now = self._now()
+            source_url = _source_url(specs_data)
+
+            # 1. 依自然鍵 upsert 產品主檔
+            product_id = existing_id
+            if not product_id:
+                if source_url:
+                    row = conn.execute("""
+                        SELECT p.F_SeqNo FROM C_Product p
+                        JOIN C_Specs_Database u
+                            ON u.F_Master_Table = 'C_Product' AND u.F_Master_ID = CAST(p.F_SeqNo AS TEXT) AND u.F_Name = ?
+                        WHERE p.F_Product IS ? AND p.F_Vendor IS ? AND u.F_Value = ?
+                        ORDER BY p.F_SeqNo LIMIT 1
+                    """, (SOURCE_URL_SPEC, product_data.get('F_Product'), product_data.get('F_Vendor'), source_url)).fetchone()
+                else:
+                    row = conn.execute(
+                        "SELECT F_SeqNo FROM C_Product WHERE F_Product IS ? AND F_Vendor IS ? ORDER BY F_SeqNo LIMIT 1",
+                        (product_data.get('F_Product'), product_data.get('F_Vendor'))
+                    ).fetchone()
+                product_id = row[0] if row else None
+
+            if product_id and product_data:
+                # 只有值實際變更時才更新 F_UpdateTime
+                assignments = ', '.join(f'{column} = ?' for column in product_data)
+                changed_filter = ' OR '.join(f'{column} IS NOT ?' for column in product_data)
+                conn.execute(
+                    f"UPDATE C_Product SET {assignments}, F_UpdateTime = ? WHERE F_SeqNo = ? AND ({changed_filter})",
+                    [*product_data.values(), now, product_id, *product_data.values()]
+                )
+            elif not product_id:
+                insert_data = {
+                    "F_Createdate": now, "F_UpdateTime": now, "F_Stat": "1", "F_Keyin": "admin",
+                    "F_Security": "S", "F_Owner": "admin", "F_BU": "GNP", **product_data
+                }
+                cursor = conn.execute(
+                    f"INSERT INTO C_Product ({', '.join(insert_data)}) VALUES ({', '.join('?' for _ in insert_data)})",
+                    list(insert_data.values())
+                )
+                product_id = cursor.lastrowid
+
+            # 2. 解析規格類別
+            category_names = list(dict.fromkeys(spec['category'] for spec in specs_data))
+            categories, created = self._resolve_categories(conn, category_names, now)
+
+            # 3. 批次 upsert 規格，移除此產品不再存在的規格
+            spec_rows = _unique_spec_rows(specs_data, categories)
+            master_id = str(product_id)
+            conn.executemany("""
+                INSERT INTO C_Specs_Database (
+                    F_Createdate, F_UpdateTime, F_Stat, F_Keyin, F_Security, F_Owner,
+                    F_Master_Table, F_Master_ID, F_Type, F_Name, F_Value
+                )
+                VALUES (?, ?, '1', 'admin', 'S', 'admin', 'C_Product', ?, ?, ?, ?)
+                ON CONFLICT (F_Master_Table, F_Master_ID, F_Type, F_Name) DO UPDATE SET
+                    F_Value = excluded.F_Value, F_UpdateTime = excluded.F_UpdateTime
+                WHERE C_Specs_Database.F_Value IS NOT excluded.F_Value
+            """, [(now, now, master_id, category_id, name, value) for category_id, name, value in spec_rows])
+
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS spec_keys (F_Type TEXT, F_Name TEXT)")
+            conn.execute("DELETE FROM spec_keys")
+            conn.executemany("INSERT INTO spec_keys VALUES (?, ?)", [(row[0], row[1]) for row in spec_rows])
+            conn.execute("""
+                DELETE FROM C_Specs_Database
+                WHERE F_Master_Table = 'C_Product' AND F_Master_ID = ?
+                AND NOT EXISTS (
+                    SELECT 1 FROM spec_keys k
+                    WHERE k.F_Type = C_Specs_Database.F_Type AND k.F_Name = C_Specs_Database.F_Name
+                )
+            """, (master_id,))
+
+            conn.commit()
+            self.categories.update(created)
+            logger.info(f"SQLite 寫入產品 ID: {product_id} 及其 {len(spec_rows)} 條規格")
+            return product_id, categories
+
+        return await self.run_db_query(_create_product_with_specs)
+
+    async def store_review_with_data(self, product_id, review_type, title, desc, data_rows):
+        def _store_review_with_data(conn):
+            now = self._now()
+            master_id = str(product_id)
+
+            conn.execute("""
+                INSERT INTO C_Product_Review (
+                    F_Createdate, F_UpdateTime, F_Stat, F_Keyin, F_Security, F_Owner,
+                    F_Master_Table, F_Master_ID, F_Type, F_Title, F_Desc
+                )
+                VALUES (?, ?, '1', 'admin', 'S', 'admin', 'C_Product', ?, ?, ?, ?)
+                ON CONFLICT (F_Master_Table, F_Master_ID, F_Type) DO UPDATE SET
+                    F_Title = excluded.F_Title, F_Desc = excluded.F_Desc, F_UpdateTime = excluded.F_UpdateTime
+                WHERE C_Product_Review.F_Title IS NOT excluded.F_Title OR C_Product_Review.F_Desc IS NOT excluded.F_Desc
+            """, (now, now, master_id, review_type, title, desc))
+            review_id = conn.execute(
+                "SELECT F_SeqNo FROM C_Product_Review WHERE F_Master_Table = 'C_Product' AND F_Master_ID = ? AND F_Type = ?",
+                (master_id, review_type)
+            ).fetchone()[0]
+
+            conn.execute("DELETE FROM C_Product_Review_Data WHERE F_Review_ID = ?", (review_id,))
+            conn.executemany("""
+                INSERT INTO C_Product_Review_Data (
+                    F_Review_ID, F_Data_Type, F_Data_Key, F_Data_Value, F_Data_Unit, F_Product_Name
+                )
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(review_id, *row) for row in data_rows])
+            data_ids = [row[0] for row in conn.execute(
+                "SELECT F_SeqNo FROM C_Product_Review_Data WHERE F_Review_ID = ? ORDER BY F_SeqNo", (review_id,)
+            )]
+
+            conn.commit()
+            return type('Review', (), {
+                "F_SeqNo": review_id,
+                "F_Type": review_type,
+                "F_Title": title,
+                "data_ids": data_ids
+            })
+
+        return await self.run_db_query(_store_review_with_data)
+
+    async def create_product(self, product_data):
+        product_id, _ = await self.create_product_with_specs(product_data, [])
+        return type('Product', (), {"F_SeqNo": product_id, "F_Product": product_data.get("F_Product", "")})
+
+    async def create_spec_category(self, category_name):
+        def _create_spec_category(conn):
+            categories, created = self._resolve_categories(conn, [category_name], self._now())
+            conn.commit()
+            self.categories.update(created)
+            return type('Category', (), {"F_SeqNo": None, "F_ID": categories[category_name], "F_Name": category_name})
+
+        return await self.run_db_query(_create_spec_category)
+
+    async def create_spec(self, product_id, category_id, spec_name, spec_value):
+        def _create_spec(conn):
+            now = self._now()
+            conn.execute("""
+                INSERT INTO C_Specs_Database (
+                    F_Createdate, F_UpdateTime, F_Stat, F_Keyin, F_Security, F_Owner,
+                    F_Master_Table, F_Master_ID, F_Type, F_Name, F_Value
+                )
+                VALUES (?, ?, '1', 'admin', 'S', 'admin', 'C_Product', ?, ?, ?, ?)
+                ON CONFLICT (F_Master_Table, F_Master_ID, F_Type, F_Name) DO UPDATE SET
+                    F_Value = excluded.F_Value, F_UpdateTime = excluded.F_UpdateTime
+                WHERE C_Specs_Database.F_Value IS NOT excluded.F_Value
+            """, (now, now, str(product_id), category_id, spec_name, spec_value))
+            conn.commit()
+            return type('Spec', (), {
+                "F_SeqNo": None,
+                "F_Master_ID": str(product_id),
+                "F_Name": spec_name,
+                "F_Value": spec_value
+            })
+
+        return await self.run_db_query(_create_spec)
+
+    async def disconnect(self):
+        self.executor.shutdown(wait=True)
+        self.conn.close()
+        logger.info("SQLite 存儲已關閉")
+
+
+class ParquetStorage(StorageBackend):
+    """欄式 Parquet 輸出：只追加不更新，每批寫成一個 part 檔，之後再批次匯入 SQL Server
+
+    每列都帶有 run_id，匯入時以 (run_id, F_SeqNo) 對應主鍵；去重交由匯入端處理。
+    """
+
+    TABLES = ('C_Product', 'C_Specs_Database', 'C_Product_Review', 'C_Product_Review_Data', 'S_Flag')
+
+    def __init__(self, directory, batch_size=5000):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet 存儲需要安裝 pyarrow")
+
+        self.directory = directory
+        self.batch_size = batch_size
+        self.run_id = datetime.now().strftime('%Y%m%d%H%M%S')
+        self.buffers = {table: [] for table in self.TABLES}
+        self.sequences = {table: 0 for table in self.TABLES}
+        self.parts = 0
+        self.categories = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='parquet')
+        for table in self.TABLES:
+            os.makedirs(os.path.join(directory, table), exist_ok=True)
+        logger.info(f"Parquet 存儲輸出至: {directory} (run_id: {self.run_id})")
+
+    def _next_id(self, table):
+        self.sequences[table] += 1
+        return self.sequences[table]
+
+    def _append(self, table, row):
+        self.buffers[table].append({'run_id': self.run_id, **row})
+
+    async def _maybe_flush(self):
+        if any(len(rows) >= self.batch_size for rows in self.buffers.values()):
+            await self.flush()
+
+    async def flush(self):
+        """將緩衝區寫成 Parquet part 檔（在專用執行緒中進行）"""
+        buffers = {table: rows for table, rows in self.buffers.items() if rows}
+        self.buffers = {table: [] for table in self.TABLES}
+        if not buffers:
+            return
+
+        self.parts += 1
+        part = self.parts
+
+        def _write():
+            import pyarrow
+            import pyarrow.parquet
+            for table, rows in buffers.items():
+                path = os.path.join(self.directory, table, f'{self.run_id}-{part:05d}.parquet')
+                pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), path)
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, _write)
+
+    async def get_crawled_products(self):
+        """讀取既有 part 檔中的產品與爬蟲中繼資料"""
+        def _read():
+            import pyarrow.parquet
+            product_dir = os.path.join(self.directory, 'C_Product')
+            spec_dir = os.path.join(self.directory, 'C_Specs_Database')
+            if not os.listdir(product_dir):
+                return []
+
+            products = pyarrow.parquet.read_table(product_dir, columns=['run_id', 'F_SeqNo', 'F_Product']).to_pylist()
+            meta = {}
+            if os.listdir(spec_dir):
+                specs = pyarrow.parquet.read_table(
+                    spec_dir, columns=['run_id', 'F_Master_ID', 'F_Name', 'F_Value'],
+                    filters=[('F_Name', 'in', [SOURCE_URL_SPEC, FINGERPRINT_SPEC])]
+                ).to_pylist()
+                for spec in specs:
+                    meta.setdefault((spec['run_id'], spec['F_Master_ID']), {})[spec['F_Name']] = spec['F_Value']
+
+            result = []
+            for product in products:
+                values = meta.get((product['run_id'], str(product['F_SeqNo'])), {})
+                result.append({
+                    'id': None,  # 跨批次的 ID 不可直接沿用，變更的產品會以新列追加
+                    'name': product['F_Product'],
+                    'url': values.get(SOURCE_URL_SPEC),
+                    'fingerprint': values.get(FINGERPRINT_SPEC),
+                })
+            return result
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _read)
+
+    async def create_product_with_specs(self, product_data, specs_data, existing_id=None):
+        now = datetime.now()
+        product_id = self._next_id('C_Product')
+        self._append('C_Product', {
+            'F_SeqNo': product_id, 'F_Createdate': now, 'F_UpdateTime': now, 'F_Stat': '1',
+            'F_Keyin': 'admin', 'F_Security': 'S', 'F_Owner': 'admin', 'F_BU': 'GNP',
+            'F_Product': product_data.get('F_Product'), 'F_Vendor': product_data.get('F_Vendor'),
+            'F_GPU_Image_URL': product_data.get('F_GPU_Image_URL'), 'F_Desc': product_data.get('F_Desc'),
+        })
+
+        categories = {}
+        for spec in specs_data:
+            categories[spec['category']] = self._category_id(spec['category'], now)
+
+        for category_id, name, value in _unique_spec_rows(specs_data, categories):
+            self._append('C_Specs_Database', {
+                'F_SeqNo': self._next_id('C_Specs_Database'), 'F_Createdate': now, 'F_UpdateTime': now,
+                'F_Stat': '1', 'F_Keyin': 'admin', 'F_Security': 'S', 'F_Owner': 'admin',
+                'F_Master_Table': 'C_Product', 'F_Master_ID': str(product_id),
+                'F_Type': category_id, 'F_Name': name, 'F_Value': value,
+            })
+
+        await self._maybe_flush()
+        return product_id, categories
+
+    def _category_id(self, category_name, now):
+        """由類別名稱的雜湊導出 F_ID，各次執行的 part 檔中同名類別的 ID 一致"""
+        if category_name not in self.categories:
+            flag_id = str(int(hashlib.sha1(category_name.encode('utf-8')).hexdigest()[:7], 16))
+            self.categories[category_name] = flag_id
+            self._append('S_Flag', {
+                'F_SeqNo': self._next_id('S_Flag'), 'F_Createdate': now, 'F_UpdateTime': now, 'F_Stat': '1',
+                'F_Keyin': 'admin', 'F_Security': 'S', 'F_Type': 'GPU 規格參數', 'F_ID': flag_id, 'F_Name': category_name,
+            })
+        return self.categories[category_name]
+
+    async def store_review_with_data(self, product_id, review_type, title, desc, data_rows):
+        now = datetime.now()
+        review_id = self._next_id('C_Product_Review')
+        self._append('C_Product_Review', {
+            'F_SeqNo': review_id, 'F_Createdate': now, 'F_UpdateTime': now, 'F_Stat': '1',
+            'F_Keyin': 'admin', 'F_Security': 'S', 'F_Owner': 'admin',
+            'F_Master_Table': 'C_Product', 'F_Master_ID': str(product_id),
+            'F_Type': review_type, 'F_Title': title, 'F_Desc': desc,
+        })
+
+        data_ids = []
+        for data_type, data_key, data_value, data_unit, product_name in data_rows:
+            data_id = self._next_id('C_Product_Review_Data')
+            data_ids.append(data_id)
+            self._append('C_Product_Review_Data', {
+                'F_SeqNo': data_id, 'F_Review_ID': review_id, 'F_Data_Type': data_type, 'F_Data_Key': data_key,
+                'F_Data_Value': data_value, 'F_Data_Unit': data_unit, 'F_Product_Name': product_name,
+            })
+
+        await self._maybe_flush()
+        return type('Review', (), {
+            "F_SeqNo": review_id,
+            "F_Type": review_type,
+            "F_Title": title,
+            "data_ids": data_ids
+        })
+
+    async def create_product(self, product_data):
+        product_id, _ = await self.create_product_with_specs(product_data, [])
+        return type('Product', (), {"F_SeqNo": product_id, "F_Product": product_data.get("F_Product", "")})
+
+    async def create_spec_category(self, category_name):
+        flag_id = self._category_id(category_name, datetime.now())
+        return type('Category', (), {"F_SeqNo": None, "F_ID": flag_id, "F_Name": category_name})
+
+    async def create_spec(self, product_id, category_id, spec_name, spec_value):
+        now = datetime.now()
+        self._append('C_Specs_Database', {
+            'F_SeqNo': self._next_id('C_Specs_Database'), 'F_Createdate': now, 'F_UpdateTime': now,
+            'F_Stat': '1', 'F_Keyin': 'admin', 'F_Security': 'S', 'F_Owner': 'admin',
+            'F_Master_Table': 'C_Product', 'F_Master_ID': str(product_id),
+            'F_Type': category_id, 'F_Name': spec_name, 'F_Value': spec_value,
+        })
+        await self._maybe_flush()
+        return type('Spec', (), {"F_SeqNo": None, "F_Master_ID": str(product_id), "F_Name": spec_name, "F_Value": spec_value})
+
+    async def disconnect(self):
+        await self.flush()
+        self.executor.shutdown(wait=True)
+        logger.info(f"Parquet 存儲已關閉，共寫入 {self.parts} 批")
+
+
+def create_storage(backend='sqlserver', path=None, pool_size=None):
+    """依設定建立存儲後端；SQL Server 後端延遲匯入，未安裝 pyodbc 的節點也能使用其他後端"""
+    backend = backend or 'sqlserver'
+    if backend == 'sqlserver':
+        from utils.database import Database
+        return Database(pool_size=pool_size)
+    if backend == 'sqlite':
+        return SQLiteStorage(path or os.path.join('data', 'gpu_specs.sqlite3'))
+    if backend == 'parquet':
+        return ParquetStorage(path or os.path.join('data', 'parquet'))
+    raise ValueError(f"不支援的存儲後端: {backend}，可選: {', '.join(STORAGE_BACKENDS)}")
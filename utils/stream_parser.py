@@ -0,0 +1,287 @@
+import hashlib
+import logging
+
+# lxml 為選用依賴，未安裝時無法使用串流解析
+try:
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:
+    etree = None
+    HAS_LXML = False
+
+logger = logging.getLogger(__name__)
+
+# 從網路讀取時每次送入解析器的大小
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# get_text 不包含的元素內容
+_SKIPPED_TEXT_TAGS = ('script', 'style')
+
+
+def _classes(element):
+    return element.get('class', '').split()
+
+
+def _text(element):
+    """等同 BeautifulSoup 的 get_text(strip=True)：各段文字去除空白後直接連接"""
+    parts = []
+
+    def walk(node):
+        if node.tag not in _SKIPPED_TEXT_TAGS and node.text:
+            parts.append(node.text.strip())
+        for child in node:
+            # 註解與處理指令不計入文字，只保留其後的 tail
+            if isinstance(child.tag, str):
+                walk(child)
+            if child.tail:
+                parts.append(child.tail.strip())
+
+    walk(element)
+    return ''.join(parts)
+
+
+def _sibling_text(node):
+    """章節內容中一個兄弟節點的文字，註解的內容也視為文字"""
+    if node.tag is etree.Comment:
+        return (node.text or '').strip()
+    if node.tag in ('p', 'span', 'div'):
+        return _text(node)
+    return ''
+
+
+def _release(element):
+    """釋放已處理完的元素及其前面的兄弟節點"""
+    element.clear(keep_tail=True)
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+class ReviewStreamParser:
+    """以 lxml 增量解析器擷取評測頁面需要的部分，不建立整份文件的樹
+
+    輸出與 GPUParser.extract_review_parts 相同的結構，可直接交給 build_review_content。
+    只有 div.text p、table 與圖片容器這類需要完整子樹的元素會保留到結束標籤，
+    其餘元素處理完即釋放，記憶體用量與頁面大小大致無關。
+    """
+
+    def __init__(self, with_tables=True):
+        if not HAS_LXML:
+            raise RuntimeError("串流解析需要安裝 lxml")
+        self.with_tables = with_tables
+        self.reset()
+
+    def reset(self, encoding=None):
+        """重新開始解析（重試請求時使用）"""
+        self._parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding)
+        self._retained = 0           # 目前位於幾層需要保留子樹的元素中
+        self._current_section = "General"
+        self._image_sections = {}    # 圖片容器 -> 開始標籤時所在章節
+        self._text_divs = []         # 依開始順序排列，結束時填入章節
+        self._pending_divs = {}
+        self.images = []
+        self.tables = []
+        self.fed = False
+
+    def feed(self, data):
+        """送入一段 HTML（bytes 或 str），處理目前可用的事件"""
+        self.fed = True
+        self._parser.feed(data)
+        self._handle_events()
+
+    def close(self):
+        """結束解析，返回擷取的評測部分"""
+        self._parser.close()
+        self._handle_events()
+
+        parts = {'title': None, 'sections': None, 'images': self.images, 'tables': self.tables}
+        if self._text_divs:
+            parts['sections'] = []
+            for title, sections in self._text_divs:
+                if parts['title'] is None and title is not None:
+                    parts['title'] = title
+                parts['sections'].extend(sections)
+        return parts
+
+    def _is_retained(self, element):
+        if element.tag == 'div' and ' '.join(_classes(element)) == 'text p':
+            return True
+        return self.with_tables and element.tag == 'table'
+
+    def _handle_events(self):
+        for event, element in self._parser.read_events():
+            if not isinstance(element.tag, str):
+                continue
+
+            if event == 'start':
+                if self._is_retained(element):
+                    self._retained += 1
+                    if element.tag == 'div':
+                        self._pending_divs[element] = len(self._text_divs)
+                        self._text_divs.append((None, []))
+                elif element.tag == 'div' and 'responsive-image-xx' in _classes(element):
+                    self._retained += 1
+                    self._image_sections[element] = self._current_section
+                continue
+
+            if element.tag == 'h2':
+                self._current_section = _text(element) or "General"
+            elif element in self._image_sections:
+                self._handle_image(element, self._image_sections.pop(element))
+                self._retained -= 1
+            elif self._is_retained(element):
+                if element.tag == 'div':
+                    self._text_divs[self._pending_divs.pop(element)] = self._extract_sections(element)
+                else:
+                    self._handle_table(element)
+                self._retained -= 1
+
+            if self._retained == 0:
+                _release(element)
+
+    def _handle_image(self, element, section):
+        img_tag = next(element.iter('img'), None)
+        if img_tag is not None and img_tag.get('src'):
+            self.images.append({
+                'section': section,
+                'url': img_tag.get('src'),
+                'alt': img_tag.get('alt', '')
+            })
+
+    @staticmethod
+    def _extract_sections(div):
+        """收集 text div 中每個 h2 到下一個 h2 之間的內容"""
+        h2_tags = list(div.iterdescendants('h2'))
+        sections = []
+        for i, current_h2 in enumerate(h2_tags):
+            next_h2 = h2_tags[i + 1] if i + 1 < len(h2_tags) else None
+
+            section_content = []
+            if current_h2.tail and current_h2.tail.strip():
+                section_content.append(current_h2.tail.strip())
+
+            current = current_h2.getnext()
+            while current is not None and current is not next_h2:
+                text = _sibling_text(current)
+                if text:
+                    section_content.append(text)
+                if current.tail and current.tail.strip():
+                    section_content.append(current.tail.strip())
+                current = current.getnext()
+
+            sections.append({
+                'title': _text(current_h2),
+                'content': '\n'.join(section_content)
+            })
+
+        title = _text(h2_tags[0]) if h2_tags else None
+        return title, sections
+
+    def _handle_table(self, table):
+        thead = next(table.iterdescendants('thead'), None)
+        tbody = next(table.iterdescendants('tbody'), None)
+        self.tables.append({
+            'headers': [_text(cell) for cell in thead.iter('th')] if thead is not None else [],
+            'rows': [
+                [_text(cell) for cell in row.iterdescendants('td', 'th')]
+                for row in table.iter('tr') if 'active' in _classes(row)
+            ],
+            'body_rows': [
+                [_text(cell) for cell in row.iterdescendants('td', 'th')]
+                for row in tbody.iter('tr') if 'active' in _classes(row)
+            ] if tbody is not None else []
+        })
+
+
+def extract_product_rows(html, chunk_size=STREAM_CHUNK_SIZE):
+    """從 /gpu-specs/ 頁面的 processors 表格擷取 (產品名稱, 連結, 指紋)"""
+    return extract_list_page(html, chunk_size=chunk_size)[0]
+
+
+def extract_list_page(html, facet_names=(), chunk_size=STREAM_CHUNK_SIZE):
+    """單次增量解析列表頁，返回 ([(產品名稱, 連結, 指紋), ...], {篩選參數: [可選值, ...]})
+
+    篩選表單位於表格之前，與表格列在同一趟解析中擷取；只保留表格內的列資料與
+    facet_names 指定的 select，表格結束後即停止解析，不處理頁面其餘部分。
+    找不到表格、表頭或 Product Name 列時產品列表為空。
+    """
+    if not HAS_LXML:
+        raise RuntimeError("快速列表解析需要安裝 lxml")
+
+    parser = etree.HTMLPullParser(events=('start', 'end'))
+    table = None       # processors 表格
+    headers = None     # colheader 表頭的欄位名稱
+    rows = []          # 每列的 [(儲存格文字, 第一個連結), ...]，第一個 tr 為表頭
+    facets = {}
+    seen_selects = set()   # 每個參數只讀取第一個 select，與 soup.find 一致
+    select = None          # 目前位於其中、需讀取選項的 select
+    finished = False
+
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+        for event, element in parser.read_events():
+            if not isinstance(element.tag, str):
+                continue
+
+            if table is None:
+                if event == 'start':
+                    if element.tag == 'table' and 'processors' in _classes(element):
+                        table = element
+                    elif select is None and element.tag == 'select':
+                        name = element.get('name')
+                        if name in facet_names and name not in seen_selects:
+                            seen_selects.add(name)
+                            select = element
+                    continue
+                if element is select:
+                    values = [option.get('value') for option in element.iter('option') if option.get('value')]
+                    if values:
+                        facets[element.get('name')] = values
+                    select = None
+                # select 內的選項須保留到 select 結束才能讀取
+                if select is None:
+                    _release(element)
+                continue
+
+            if event != 'end':
+                continue
+
+            if element.tag == 'thead' and headers is None and 'colheader' in _classes(element):
+                headers = [_text(th) for th in element.iter('th')]
+            elif element.tag == 'tr':
+                cells = []
+                for td in element.iterdescendants('td'):
+                    link = next(td.iter('a'), None)
+                    cells.append((_text(td), (_text(link), link.get('href')) if link is not None else None))
+                rows.append(cells)
+                # 表頭在 thead 結束時已讀取，列內容擷取後即可釋放
+                if headers is not None:
+                    _release(element)
+            elif element is table:
+                finished = True
+                break
+        if finished:
+            break
+
+    if table is None:
+        logger.warning("找不到 class='processors' 的表格")
+        return [], facets
+    if headers is None:
+        logger.warning("找不到 class='colheader' 的表頭")
+        return [], facets
+    if 'Product Name' not in headers:
+        logger.warning("找不到 Product Name 列")
+        return [], facets
+    product_name_index = headers.index('Product Name')
+
+    products = []
+    # 跳過表頭行
+    for cells in rows[1:]:
+        if len(cells) > product_name_index:
+            link = cells[product_name_index][1]
+            if link and link[0] and link[1]:
+                # 以整列內容計算指紋，用於增量模式判斷資料是否變更
+                row_text = '|'.join(text for text, _ in cells)
+                products.append((link[0], link[1], hashlib.sha1(row_text.encode('utf-8')).hexdigest()))
+    return products, facets